@@ -0,0 +1,197 @@
+# Benchmark suite for the hot paths: map generation, flood, enemy ticks and rendering
+#
+# Run from the repository root:
+#   python -m benchmarks.run_benchmarks --output results.json
+#   python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+#
+# benchmarks/baseline.json is the committed reference. Timings depend on the machine, so
+# re-save it on your own hardware (--save-baseline) before comparing against it.
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from procedural_map.map_generator import generate_map, flood, ROAD
+
+MAP_SIZES = [64, 128, 256, 512, 1024, 2048]
+ENEMY_COUNTS = [10, 100, 1000, 10000, 100000]
+SEED = 1234
+# Relative slowdown against the baseline that counts as a regression
+REGRESSION_THRESHOLD = 0.10
+
+def measure(fn, repeat):
+    # Median/min wall time over repeat runs, then one traced run for memory and allocations
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # Net blocks still allocated after the run, across all allocation sites
+    alloc_blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, 'filename'))
+    return {
+        'time_s': statistics.median(times),
+        'min_s': min(times),
+        'runs': repeat,
+        'peak_bytes': peak - base,
+        'alloc_blocks': alloc_blocks,
+    }
+
+def bench_generation(results, sizes, repeat):
+    for size in sizes:
+        results[f'generate_map[{size}]'] = measure(lambda: generate_map(size, seed=SEED), repeat)
+
+def bench_flood(results, sizes, repeat):
+    for size in sizes:
+        grid = generate_map(size, seed=SEED)
+        center = size // 2
+        results[f'flood[{size}]'] = measure(lambda: flood(grid.cells, center, center), repeat)
+
+def bench_enemy_tick(results, counts, repeat, ticks=60):
+    from simulation import Simulation
+    from enemies.enemy_system import MOVE_INTERVALS
+    for count in counts:
+        sim = Simulation.create(256, seed=SEED, max_enemies=0)
+        system = sim.enemy_system
+        rng = np.random.default_rng(SEED)
+        ys, xs = np.nonzero(sim.map_grid.cells == ROAD)
+        picks = rng.integers(0, len(xs), count)
+        types = rng.integers(0, 3, count)
+        indices = system.add_many(types, xs[picks], ys[picks])
+        # Spread the move times so each tick sees a steady-state share of due enemies
+        system.set_elapsed(indices, rng.random(count) * MOVE_INTERVALS[types])
+        result = measure(lambda: sim.run(ticks), repeat)
+        result['time_s'] /= ticks
+        result['min_s'] /= ticks
+        result['ticks'] = ticks
+        results[f'enemy_tick[{count}]'] = result
+
+def bench_render(results, repeat, frames=30):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        _bench_render(results, repeat, frames, cache_dir)
+
+def _bench_render(results, repeat, frames, cache_dir):
+    import pygame
+    import main
+    import game_screen
+    from game_screen import draw_gameplay
+    from procedural_map.map_cache import MapCache
+    # Font lookups and the fixed seed's map both go through on-disk caches: keep them out of
+    # the user's cache dir
+    game_screen.FONT_CACHE_FILE = os.path.join(cache_dir, "fonts.json")
+    main.init_display()
+    game = main.Game()
+    game.loader.map_cache = MapCache(cache_dir)
+    game.map_seed = SEED
+    game.start_game()
+    if game.state == "loading":
+        game.load_job.result()  # Block on the background load
+        game.update_loading()
+    for zoom_index, viewport_size in enumerate(game.zoom_levels):
+        game.zoom_index = zoom_index
+        game.draw(main.WIN)  # Warm the terrain cache for this zoom level
+        def draw_frames():
+            for _ in range(frames):
+                game.draw(main.WIN)
+        result = measure(draw_frames, repeat)
+        result['time_s'] /= frames
+        result['min_s'] /= frames
+        result['frames'] = frames
+        results[f'game_draw[{viewport_size}]'] = result
+        window = game.map_grid.window(0, 0, viewport_size, viewport_size)
+        def draw_window():
+            for _ in range(frames):
+                draw_gameplay(main.WIN, window)
+        result = measure(draw_window, repeat)
+        result['time_s'] /= frames
+        result['min_s'] /= frames
+        result['frames'] = frames
+        results[f'draw_gameplay[{viewport_size}]'] = result
+    game.loader.shutdown()
+    pygame.quit()
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    # Print ratios against the baseline; returns the names that regressed
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            print(f"{name:28s} {result['time_s']*1000:10.3f} ms   (no baseline)")
+            continue
+        ratio = result['time_s'] / base['time_s'] if base['time_s'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = '  improved'
+        print(f"{name:28s} {result['time_s']*1000:10.3f} ms  x{ratio:5.2f} vs {base['time_s']*1000:.3f} ms{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generation, AI ticks and rendering")
+    parser.add_argument("--sizes", type=int, nargs='+', default=MAP_SIZES)
+    parser.add_argument("--enemies", type=int, nargs='+', default=ENEMY_COUNTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", choices=['generation', 'flood', 'enemies', 'render'], nargs='+')
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this stored results JSON")
+    parser.add_argument("--save-baseline", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    only = set(args.only or ['generation', 'flood', 'enemies', 'render'])
+    results = {}
+    if 'generation' in only:
+        bench_generation(results, args.sizes, args.repeat)
+    if 'flood' in only:
+        bench_flood(results, args.sizes, args.repeat)
+    if 'enemies' in only:
+        bench_enemy_tick(results, args.enemies, args.repeat)
+    if 'render' in only:
+        bench_render(results, args.repeat)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    elif not args.baseline:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
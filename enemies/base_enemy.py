@@ -1,5 +1,6 @@
 # Base enemy class
 import random
+from procedural_map.road_graph import get_road_graph
 
 class BaseEnemy:
     def __init__(self, map_grid, x, y):
@@ -8,10 +9,49 @@ class BaseEnemy:
         self.x = x
         self.y = y
         self.speed = 1
+        self.flow_field = None  # Shared FlowField toward the player, set by the game
+        self.spatial_index = None  # SpatialHash kept up to date as the enemy moves
+        self.visibility = None  # Player Visibility for line-of-sight checks, set by the game
     def can_move(self, dx, dy):
         nx, ny = self.x + dx, self.y + dy
         return 0 <= nx < self.map_size and 0 <= ny < self.map_size and self.map_grid[ny][nx] == 0
+    def step(self, dx, dy):
+        self.x += dx
+        self.y += dy
+        if self.spatial_index is not None:
+            self.spatial_index.update(self)
+    def wander(self):
+        # Move randomly to adjacent road
+        dirs = [(0,1),(0,-1),(1,0),(-1,0)]
+        random.shuffle(dirs)
+        for dx, dy in dirs:
+            if self.can_move(dx, dy):
+                self.step(dx, dy)
+                break
+    def chase(self, player):
+        # Step along the shared flow field; without one, step greedily toward the player
+        if self.flow_field is not None:
+            step = self.flow_field.next_step(self.x, self.y)
+            if step:
+                self.step(*step)
+            return
+        dx = 1 if player.x > self.x else -1 if player.x < self.x else 0
+        dy = 1 if player.y > self.y else -1 if player.y < self.y else 0
+        if abs(dx) > abs(dy):
+            if self.can_move(dx, 0):
+                self.step(dx, 0)
+            elif self.can_move(0, dy):
+                self.step(0, dy)
+        else:
+            if self.can_move(0, dy):
+                self.step(0, dy)
+            elif self.can_move(dx, 0):
+                self.step(dx, 0)
     def move(self):
         pass
+    def path_to(self, x, y):
+        # Shortest road path to (x, y) over the road graph, or None
+        graph = get_road_graph(self.map_grid)
+        return graph.find_path((self.x, self.y), (x, y)) if graph else None
     def get_color(self):
         return (255,0,0), (180,0,0)  # Default: red shades
@@ -0,0 +1,262 @@
+# Enemy system: enemy state as struct-of-arrays, advanced in batched numpy operations
+import math
+import numpy as np
+from procedural_map.grid import ROAD
+from scheduler import TimingWheel
+from enemies.wanderer import WandererEnemy
+from enemies.follower import FollowerEnemy
+from enemies.hunter import HunterEnemy
+
+WANDERER = 0
+FOLLOWER = 1
+HUNTER = 2
+TYPE_IDS = {'wanderer': WANDERER, 'follower': FOLLOWER, 'hunter': HUNTER}
+TYPE_NAMES = {v: k for k, v in TYPE_IDS.items()}
+TYPE_CLASSES = {WANDERER: WandererEnemy, FOLLOWER: FollowerEnemy, HUNTER: HunterEnemy}
+# Seconds between moves: wanderer medium/default, follower slow, hunter fast
+MOVE_INTERVALS = np.array([1.0, 1.5, 0.6])
+FOLLOW_CHANCE = 0.7
+HUNTER_FOLLOW_DISTANCE = 10
+# Same order as FlowField.STEPS so batched and per-enemy chasing agree
+STEPS = np.array([(0,1),(0,-1),(1,0),(-1,0)], dtype=np.int32)
+
+def _view_class(cls):
+    # Subclass of an enemy class whose position lives in the system arrays
+    class View(cls):
+        def __init__(self, system, index):
+            self.system = system
+            self.index = index
+            super().__init__(system.map_grid, int(system.xs[index]), int(system.ys[index]))
+            self.flow_field = system.flow_field
+            self.spatial_index = system.spatial_index
+            self.visibility = system.visibility
+
+        @property
+        def x(self):
+            return int(self.system.xs[self.index])
+
+        @x.setter
+        def x(self, value):
+            self.system.xs[self.index] = value
+
+        @property
+        def y(self):
+            return int(self.system.ys[self.index])
+
+        @y.setter
+        def y(self, value):
+            self.system.ys[self.index] = value
+
+    View.__name__ = View.__qualname__ = cls.__name__ + 'View'
+    return View
+
+VIEW_CLASSES = {t: _view_class(cls) for t, cls in TYPE_CLASSES.items()}
+
+class EnemySystem:
+    def __init__(self, map_grid, capacity=16, seed=None, dt=1/60):
+        self.map_grid = map_grid
+        self.count = 0
+        self.xs = np.zeros(capacity, dtype=np.int32)
+        self.ys = np.zeros(capacity, dtype=np.int32)
+        self.types = np.zeros(capacity, dtype=np.uint8)
+        # Moves are scheduled on a timing wheel of dt-long ticks: each slot holds index arrays
+        # of enemies due that tick, so a tick only touches the enemies that move in it.
+        # next_move is the authoritative due tick; wheel entries that disagree are stale.
+        self.next_move = np.zeros(capacity, dtype=np.int64)
+        self.dt = dt
+        self.interval_ticks = np.array([math.ceil(i / dt - 1e-9) for i in MOVE_INTERVALS], dtype=np.int64)
+        self.wheel = TimingWheel()
+        self.pending_time = 0.0
+        self.rng = np.random.default_rng(seed)
+        self.flow_field = None
+        self.spatial_index = None
+        self.visibility = None  # Player Visibility; hunters then need line of sight to chase
+        self.views = {}
+
+    def __len__(self):
+        return self.count
+
+    def _reserve(self, n):
+        capacity = len(self.xs)
+        if n <= capacity:
+            return
+        while capacity < n:
+            capacity *= 2
+        for name in ('xs', 'ys', 'types', 'next_move'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add_many(self, types, xs, ys):
+        # Bulk spawn without creating view objects; returns the new indices
+        types = np.asarray(types, dtype=np.uint8)
+        start, end = self.count, self.count + len(types)
+        self._reserve(end)
+        self.xs[start:end] = xs
+        self.ys[start:end] = ys
+        self.types[start:end] = types
+        self.count = end
+        indices = np.arange(start, end)
+        self._schedule(indices, self.wheel.now - 1 + self.interval_ticks[types])
+        return indices
+
+    def _schedule(self, idx, ticks):
+        # One wheel entry per distinct due tick
+        self.next_move[idx] = ticks
+        for tick in np.unique(ticks).tolist():
+            self.wheel.schedule(tick, idx[ticks == tick])
+
+    def elapsed(self, idx=None):
+        # Seconds since each enemy last moved (or spawned), for saving and shard handoff
+        if idx is None:
+            idx = np.arange(self.count)
+        remaining = self.next_move[idx] - self.wheel.now + 1
+        return (self.interval_ticks[self.types[idx]] - remaining) * self.dt
+
+    def set_elapsed(self, idx, seconds):
+        # Reschedule enemies as if their last move was this many seconds ago
+        idx = np.asarray(idx)
+        done = np.rint(np.asarray(seconds) / self.dt).astype(np.int64)
+        ticks = self.wheel.now - 1 + self.interval_ticks[self.types[idx]] - done
+        self._schedule(idx, np.maximum(ticks, self.wheel.now))
+
+    def remove_many(self, indices):
+        # Drop enemies and compact the arrays, keeping order; returns the keep mask over old indices
+        n = self.count
+        keep = np.ones(n, dtype=bool)
+        keep[indices] = False
+        m = int(keep.sum())
+        for name in ('xs', 'ys', 'types', 'next_move'):
+            arr = getattr(self, name)
+            arr[:m] = arr[:n][keep]
+        self.count = m
+        new_index = np.cumsum(keep) - 1
+        def remap(idx):
+            idx = idx[idx < n]
+            idx = new_index[idx[keep[idx]]]
+            return idx if len(idx) else None
+        self.wheel.rewrite(remap)
+        if self.views:
+            # Views follow their enemy to its new index; views of removed enemies are dropped
+            views = {}
+            for i, view in self.views.items():
+                if keep[i]:
+                    view.index = int(new_index[i])
+                    views[view.index] = view
+                elif self.spatial_index is not None:
+                    self.spatial_index.remove(view)
+            self.views = views
+        return keep
+
+    def add(self, etype, x, y):
+        # Spawn one enemy ('wanderer', 'follower', 'hunter') and return its class view
+        index = int(self.add_many([TYPE_IDS[etype]], [x], [y])[0])
+        return self.view(index)
+
+    def view(self, index):
+        view = self.views.get(index)
+        if view is None:
+            view = VIEW_CLASSES[int(self.types[index])](self, index)
+            self.views[index] = view
+        return view
+
+    def update(self, dt, player):
+        # Advance the wheel by dt and move the enemies due in the ticks passed; returns moved indices
+        self.pending_time += dt
+        ticks = int(self.pending_time / self.dt + 1e-9)
+        self.pending_time -= ticks * self.dt
+        moved = []
+        for _ in range(ticks):
+            tick = self.wheel.now
+            batches = self.wheel.pop_due()
+            if not batches:
+                continue
+            if len(batches) == 1:
+                due = batches[0]
+            else:
+                due = np.sort(np.concatenate(batches))
+                due = due[np.append(True, due[1:] != due[:-1])]
+            due = due[self.next_move[due] == tick]  # drop entries superseded by set_elapsed
+            if not due.size:
+                continue
+            # Reschedule before moving; everyone due now shares a base tick, so one entry per type
+            types = self.types[due]
+            for etype, interval in enumerate(self.interval_ticks.tolist()):
+                batch = due[types == etype]
+                if len(batch):
+                    self.next_move[batch] = tick + interval
+                    self.wheel.schedule(tick + interval, batch)
+            moved.append(self.move(due, player))
+        if not moved:
+            return np.zeros(0, dtype=np.int64)
+        return moved[0] if len(moved) == 1 else np.concatenate(moved)
+
+    def move(self, idx, player):
+        xs, ys = self.xs[idx], self.ys[idx]
+        types = self.types[idx]
+        chasing = np.zeros(len(idx), dtype=bool)
+        if player is not None:
+            followers = types == FOLLOWER
+            chasing[followers] = self.rng.random(int(followers.sum())) < FOLLOW_CHANCE
+            hunters = types == HUNTER
+            near = np.abs(player.x - xs) + np.abs(player.y - ys) <= HUNTER_FOLLOW_DISTANCE
+            if self.visibility is not None:
+                # Shadowcasting is symmetric: the player seeing a hunter means it sees the player
+                near &= self.visibility.visible[ys, xs]
+            chasing |= hunters & near
+        dx = np.zeros(len(idx), dtype=np.int32)
+        dy = np.zeros(len(idx), dtype=np.int32)
+        wander = ~chasing
+        if wander.any():
+            dx[wander], dy[wander] = self._wander_steps(xs[wander], ys[wander])
+        if chasing.any():
+            dx[chasing], dy[chasing] = self._chase_steps(xs[chasing], ys[chasing], player)
+        moved_mask = (dx != 0) | (dy != 0)
+        self.xs[idx] = xs + dx
+        self.ys[idx] = ys + dy
+        moved = idx[moved_mask]
+        if self.spatial_index is not None and self.views:
+            for i in moved.tolist():
+                view = self.views.get(i)
+                if view is not None:
+                    self.spatial_index.update(view)
+        return moved
+
+    def _neighbour_roads(self, xs, ys):
+        # (k, 4) mask of which STEPS lead onto a road
+        nx = xs[:, None] + STEPS[:, 0]
+        ny = ys[:, None] + STEPS[:, 1]
+        return self.map_grid.cells_at(nx, ny) == ROAD
+
+    def _wander_steps(self, xs, ys):
+        # Uniformly random passable direction, like shuffling the directions and taking the first
+        ok = self._neighbour_roads(xs, ys)
+        keys = self.rng.random(ok.shape)
+        keys[~ok] = -1
+        choice = STEPS[keys.argmax(axis=1)] * ok.any(axis=1)[:, None]
+        return choice[:, 0], choice[:, 1]
+
+    def _chase_steps(self, xs, ys, player):
+        flow_field = self.flow_field
+        if flow_field is not None:
+            # Neighbour one closer on the shared flow field, first in STEPS order
+            dist = flow_field.dist_grid
+            d = dist[ys, xs]
+            nx = xs[:, None] + STEPS[:, 0]
+            ny = ys[:, None] + STEPS[:, 1]
+            closer = (dist[ny, nx] == (d - 1)[:, None]) & (d > 0)[:, None]
+            choice = STEPS[closer.argmax(axis=1)] * closer.any(axis=1)[:, None]
+            return choice[:, 0], choice[:, 1]
+        # Greedy step toward the player: along x when only x differs, else y first then x
+        sx = np.sign(player.x - xs).astype(np.int32)
+        sy = np.sign(player.y - ys).astype(np.int32)
+        prefer_x = (sx != 0) & (sy == 0)
+        zero = np.zeros_like(sx)
+        first_x, first_y = np.where(prefer_x, sx, zero), np.where(prefer_x, zero, sy)
+        second_x, second_y = np.where(prefer_x, zero, sx), np.where(prefer_x, sy, zero)
+        ok1 = self.map_grid.cells_at(xs + first_x, ys + first_y) == ROAD
+        ok2 = self.map_grid.cells_at(xs + second_x, ys + second_y) == ROAD
+        dx = np.where(ok1, first_x, np.where(ok2, second_x, zero))
+        dy = np.where(ok1, first_y, np.where(ok2, second_y, zero))
+        return dx, dy
@@ -0,0 +1,179 @@
+# Flow field: BFS distance to the player over road cells, shared by all chasing enemies
+from array import array
+from collections import deque
+import heapq
+import numpy as np
+from procedural_map.grid import ROAD
+
+UNREACHABLE = -1
+STEPS = [(0,1),(0,-1),(1,0),(-1,0)]
+
+class FlowField:
+    def __init__(self, map_grid):
+        self.map_grid = map_grid
+        self.size = len(map_grid)
+        # Flat distance array for fast per-cell access, with a zero-copy numpy view for bulk ops
+        self.dist = array('i', [UNREACHABLE]) * (self.size * self.size)
+        self.dist_grid = np.frombuffer(self.dist, dtype=np.int32).reshape(self.size, self.size)
+        self.offsets = [dy * self.size + dx for dx, dy in STEPS]
+        self.passable = bytearray()
+        self.root = None
+
+    def share(self, buf):
+        # Keep the distances in buf (size * size int32, e.g. shared memory) from now on
+        view = memoryview(buf).cast('B').cast('i')
+        view[:] = self.dist
+        self.dist = view
+        self.dist_grid = np.frombuffer(view, dtype=np.int32).reshape(self.size, self.size)
+
+    def unshare(self):
+        # Move the distances back into a private array so the shared buffer can be released
+        dist = array('i')
+        dist.frombytes(self.dist_grid.tobytes())
+        self.dist_grid = np.frombuffer(dist, dtype=np.int32).reshape(self.size, self.size)
+        self.dist.release()
+        self.dist = dist
+
+    def distance(self, x, y):
+        return self.dist[y * self.size + x]
+
+    def update(self, x, y):
+        # Re-root the field at the player; cheap when the player moved one step
+        if self.root == (x, y):
+            return
+        if self.root is not None and abs(x - self.root[0]) + abs(y - self.root[1]) == 1 and self.distance(x, y) == 1:
+            self._shift_root(x, y)
+        else:
+            self.rebuild(x, y)
+        self.root = (x, y)
+
+    def rebuild(self, x, y):
+        # Full BFS from (x, y). Map edges are always BORDER, so flat neighbours never wrap.
+        size = self.size
+        self.passable = bytearray((self.map_grid.cells == ROAD).tobytes())
+        self.dist_grid.fill(UNREACHABLE)
+        self.root = (x, y)
+        start = y * size + x
+        if not self.passable[start]:
+            return
+        dist, passable, offsets = self.dist, self.passable, self.offsets
+        dist[start] = 0
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            nd = dist[i] + 1
+            for off in offsets:
+                j = i + off
+                if passable[j] and dist[j] == UNREACHABLE:
+                    dist[j] = nd
+                    queue.append(j)
+
+    def _shift_root(self, x, y):
+        # Grid graphs are bipartite, so moving the root one step changes every distance by
+        # exactly +-1. Cells whose shortest path ran through the new root (its descendants in
+        # the BFS DAG) get one closer; every other reachable cell gets one farther.
+        dist, offsets = self.dist, self.offsets
+        start = y * self.size + x
+        closer = {start}
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            nd = dist[i] + 1
+            for off in offsets:
+                j = i + off
+                if dist[j] == nd and j not in closer:
+                    closer.add(j)
+                    stack.append(j)
+        flat = self.dist_grid.reshape(-1)
+        flat[flat != UNREACHABLE] += 1
+        flat[np.fromiter(closer, dtype=np.intp, count=len(closer))] -= 2
+
+    def on_terrain_change(self, change):
+        # Repair distances around one edited cell instead of re-running the whole BFS
+        if self.root is None:
+            return
+        i = change.index
+        road = change.new == ROAD
+        self.passable[i] = road
+        if i == self.root[1] * self.size + self.root[0]:
+            # The root itself: blocked, nothing is reachable; dug back, everything is again
+            if road:
+                self.rebuild(*self.root)
+            else:
+                self.dist_grid.fill(UNREACHABLE)
+        elif road:
+            self._repair_dig(i)
+        else:
+            self._repair_block(i)
+
+    def _repair_dig(self, i):
+        # A new road can only shorten paths: relax outward from it while distances drop
+        dist, passable, offsets = self.dist, self.passable, self.offsets
+        reached = [dist[i + off] for off in offsets if dist[i + off] != UNREACHABLE]
+        if not reached:
+            return
+        dist[i] = min(reached) + 1
+        queue = deque([i])
+        while queue:
+            k = queue.popleft()
+            nd = dist[k] + 1
+            for off in offsets:
+                j = k + off
+                if passable[j] and (dist[j] == UNREACHABLE or dist[j] > nd):
+                    dist[j] = nd
+                    queue.append(j)
+
+    def _repair_block(self, i):
+        # Cells whose every shortest path ran through i get farther (or unreachable); find them
+        # layer by layer, then re-seed them from their unaffected neighbours.
+        dist, passable, offsets = self.dist, self.passable, self.offsets
+        d = dist[i]
+        dist[i] = UNREACHABLE
+        if d == UNREACHABLE:
+            return
+        affected = {i}
+        queue = deque([i])
+        while queue:
+            k = queue.popleft()
+            nd = dist[k] + 1 if k != i else d + 1
+            for off in offsets:
+                j = k + off
+                if j in affected or not passable[j] or dist[j] != nd:
+                    continue
+                # Still has a parent one step closer that keeps its distance?
+                if any(dist[j + o] == nd - 1 and passable[j + o] and j + o not in affected for o in offsets):
+                    continue
+                affected.add(j)
+                queue.append(j)
+        affected.discard(i)
+        for k in affected:
+            dist[k] = UNREACHABLE
+        # Unit-weight Dijkstra restricted to the affected cells, seeded from their boundary
+        heap = []
+        for k in affected:
+            reached = [dist[k + off] for off in offsets
+                       if dist[k + off] != UNREACHABLE and k + off not in affected]
+            if reached:
+                heap.append((min(reached) + 1, k))
+        heapq.heapify(heap)
+        while heap:
+            nd, k = heapq.heappop(heap)
+            if dist[k] != UNREACHABLE and dist[k] <= nd:
+                continue
+            dist[k] = nd
+            for off in offsets:
+                j = k + off
+                if j in affected and (dist[j] == UNREACHABLE or dist[j] > nd + 1):
+                    heapq.heappush(heap, (nd + 1, j))
+
+    def next_step(self, x, y):
+        # (dx, dy) one step closer to the player, or None if unreachable or already there
+        i = y * self.size + x
+        d = self.dist[i]
+        if d <= 0:
+            return None
+        dist = self.dist
+        for off, step in zip(self.offsets, STEPS):
+            if dist[i + off] == d - 1:
+                return step
+        return None
@@ -1,6 +1,5 @@
 # Hunter enemy: Red center, Yellow, follows if close
 from enemies.base_enemy import BaseEnemy
-import random
 
 class HunterEnemy(BaseEnemy):
     def __init__(self, map_grid, x, y):
@@ -8,29 +7,16 @@ class HunterEnemy(BaseEnemy):
         self.speed = 2
         self.follow_distance = 10
     def move(self, player):
-        dist = abs(player.x - self.x) + abs(player.y - self.y)
-        if dist <= self.follow_distance:
+        if self.spatial_index is not None:
+            near = player in self.spatial_index.query_radius(self.x, self.y, self.follow_distance)
+        else:
+            near = abs(player.x - self.x) + abs(player.y - self.y) <= self.follow_distance
+        sees_player = self.visibility is None or self.visibility.can_see(self.x, self.y)
+        if near and sees_player:
             # Follow player
-            dx = 1 if player.x > self.x else -1 if player.x < self.x else 0
-            dy = 1 if player.y > self.y else -1 if player.y < self.y else 0
-            if abs(dx) > abs(dy):
-                if self.can_move(dx, 0):
-                    self.x += dx
-                elif self.can_move(0, dy):
-                    self.y += dy
-            else:
-                if self.can_move(0, dy):
-                    self.y += dy
-                elif self.can_move(dx, 0):
-                    self.x += dx
+            self.chase(player)
         else:
             # Wander randomly
-            dirs = [(0,1),(0,-1),(1,0),(-1,0)]
-            random.shuffle(dirs)
-            for dx, dy in dirs:
-                if self.can_move(dx, dy):
-                    self.x += dx
-                    self.y += dy
-                    break
+            self.wander()
     def get_color(self):
         return (255,0,0), (255,220,40)  # Red center, yellow outer
@@ -0,0 +1,238 @@
+# Sharded enemy simulation: one worker process per band of map rows, all reading one shared grid
+#
+# The grid, the player's flow field and visibility mask live in a single shared_memory block,
+# so workers map them without copying. Each worker runs an EnemySystem for the enemies in its
+# band; enemies that step out of a band are handed to the shard that owns their new row.
+#
+# Benchmark from the repository root:
+#   python -m enemies.sharded --size 1024 --enemies 200000 --shards 4 --ticks 200
+import argparse
+import time
+from multiprocessing import get_context, shared_memory
+import numpy as np
+from procedural_map.grid import MapGrid
+from enemies.enemy_system import EnemySystem, TYPE_IDS
+
+def _layout(size):
+    # Byte offsets of the cells, flow-field distances and visible mask in the shared block
+    cells = 0
+    dist = (size * size + 7) // 8 * 8
+    visible = dist + 4 * size * size
+    return cells, dist, visible, visible + size * size
+
+def _shared_arrays(buf, size):
+    cells_at, dist_at, visible_at, _ = _layout(size)
+    cells = np.ndarray((size, size), dtype=np.uint8, buffer=buf, offset=cells_at)
+    dist = np.ndarray((size, size), dtype=np.int32, buffer=buf, offset=dist_at)
+    visible = np.ndarray((size, size), dtype=bool, buffer=buf, offset=visible_at)
+    return cells, dist, visible
+
+class _SharedFlowField:
+    # What EnemySystem reads from a FlowField, backed by the shared distances
+    def __init__(self, dist_grid):
+        self.dist_grid = dist_grid
+
+class _SharedVisibility:
+    def __init__(self, visible):
+        self.visible = visible
+
+class _PlayerPos:
+    __slots__ = ('x', 'y')
+
+def _empty_batch():
+    return (np.zeros(0, np.int64), np.zeros(0, np.uint8), np.zeros(0, np.int32),
+            np.zeros(0, np.int32), np.zeros(0, np.float64))
+
+def _shard_worker(conn, shm_name, size, band, seed, line_of_sight, dt):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        _run_shard(conn, shm.buf, size, band, seed, line_of_sight, dt)
+    finally:
+        # _run_shard has returned, so no arrays still point into the block
+        shm.close()
+        conn.close()
+
+def _run_shard(conn, buf, size, band, seed, line_of_sight, dt):
+    cells, dist, visible = _shared_arrays(buf, size)
+    system = EnemySystem(MapGrid(cells), seed=seed, dt=dt)
+    system.flow_field = _SharedFlowField(dist)
+    if line_of_sight:
+        system.visibility = _SharedVisibility(visible)
+    ids = np.zeros(len(system.xs), dtype=np.int64)  # global id of each local enemy
+    y0, y1 = band
+    player = _PlayerPos()
+    while True:
+        msg = conn.recv()
+        if msg[0] == 'stop':
+            return
+        _, dt, player.x, player.y, inbound = msg
+        in_ids, in_types, in_xs, in_ys, in_elapsed = inbound
+        if len(in_ids):
+            idx = system.add_many(in_types, in_xs, in_ys)
+            system.set_elapsed(idx, in_elapsed)
+            if len(ids) < len(system.xs):
+                ids = np.resize(ids, len(system.xs))
+            ids[idx] = in_ids
+        moved = system.update(dt, player)
+        # Deltas for the main process, then hand off whoever left the band
+        delta = (ids[moved], system.xs[moved], system.ys[moved])
+        leaving = moved[(system.ys[moved] < y0) | (system.ys[moved] >= y1)]
+        if len(leaving):
+            outbound = (ids[leaving], system.types[leaving], system.xs[leaving],
+                        system.ys[leaving], system.elapsed(leaving))
+            keep = system.remove_many(leaving)
+            ids[:len(system)] = ids[:len(keep)][keep]
+        else:
+            outbound = _empty_batch()
+        conn.send((delta, outbound))
+
+class ShardedEnemySystem:
+    # Drop-in for EnemySystem.update/add_many on a finite MapGrid; positions are mirrored here by id
+    def __init__(self, map_grid, shards=2, seed=None, flow_field=None, visibility=None, dt=1/60):
+        size = map_grid.size
+        self.size = size
+        self.flow_field = flow_field
+        self.visibility = visibility
+        self.shm = shared_memory.SharedMemory(create=True, size=_layout(size)[3])
+        self.cells, self.dist, self.visible = _shared_arrays(self.shm.buf, size)
+        self.cells[:] = map_grid.cells
+        # The field and mask are kept in the shared block itself, so updates need no publishing
+        if flow_field:
+            dist_at = _layout(size)[1]
+            flow_field.share(self.shm.buf[dist_at:dist_at + 4 * size * size])
+        else:
+            self.dist.fill(-1)
+        if visibility:
+            self.visible[:] = visibility.visible
+            visibility.visible = self.visible
+        # Equal row bands; band i owns rows [starts[i], starts[i + 1])
+        self.starts = np.linspace(0, size, shards + 1).astype(np.int64)
+        self.count = 0
+        self.xs = np.zeros(16, dtype=np.int32)
+        self.ys = np.zeros(16, dtype=np.int32)
+        self.types = np.zeros(16, dtype=np.uint8)
+        self.pending = [list() for _ in range(shards)]  # inbound batches per shard
+        ctx = get_context()
+        seeds = np.random.SeedSequence(seed).spawn(shards)
+        self.conns = []
+        self.workers = []
+        for i in range(shards):
+            parent, child = ctx.Pipe()
+            band = (int(self.starts[i]), int(self.starts[i + 1]))
+            worker = ctx.Process(target=_shard_worker, daemon=True,
+                                 args=(child, self.shm.name, size, band, seeds[i], visibility is not None, dt))
+            worker.start()
+            child.close()
+            self.conns.append(parent)
+            self.workers.append(worker)
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def shard_of(self, ys):
+        return np.searchsorted(self.starts, ys, side='right') - 1
+
+    def _route(self, batch):
+        ids, types, xs, ys, elapsed = batch
+        shard = self.shard_of(ys)
+        for i in np.unique(shard).tolist():
+            mask = shard == i
+            self.pending[i].append((ids[mask], types[mask], xs[mask], ys[mask], elapsed[mask]))
+
+    def add_many(self, types, xs, ys):
+        types = np.asarray(types, dtype=np.uint8)
+        start, end = self.count, self.count + len(types)
+        if end > len(self.xs):
+            capacity = max(end, 2 * len(self.xs))
+            self.xs, self.ys, self.types = (np.resize(a, capacity) for a in (self.xs, self.ys, self.types))
+        self.xs[start:end] = xs
+        self.ys[start:end] = ys
+        self.types[start:end] = types
+        self.count = end
+        ids = np.arange(start, end)
+        self._route((ids, types, self.xs[start:end].copy(), self.ys[start:end].copy(), np.zeros(len(ids))))
+        return ids
+
+    def add(self, etype, x, y):
+        return int(self.add_many([TYPE_IDS[etype]], [x], [y])[0])
+
+    def on_terrain_change(self, change):
+        # Workers read the shared cells directly
+        self.cells[change.y, change.x] = change.new
+
+    def update(self, dt, player):
+        # One tick on every shard in parallel; returns the ids of enemies that moved
+        for i, conn in enumerate(self.conns):
+            batches = self.pending[i]
+            inbound = tuple(np.concatenate(parts) for parts in zip(*batches)) if batches else _empty_batch()
+            self.pending[i] = []
+            conn.send(('step', dt, player.x, player.y, inbound))
+        moved = []
+        for conn in self.conns:
+            (ids, xs, ys), outbound = conn.recv()
+            self.xs[ids] = xs
+            self.ys[ids] = ys
+            moved.append(ids)
+            if len(outbound[0]):
+                self._route(outbound)
+        return np.concatenate(moved)
+
+    def close(self):
+        if self.shm is None:
+            return
+        for conn, worker in zip(self.conns, self.workers):
+            try:
+                conn.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+            worker.join(timeout=5)
+            conn.close()
+        if self.flow_field:
+            self.flow_field.unshare()
+        if self.visibility:
+            self.visibility.visible = self.visible.copy()
+        del self.cells, self.dist, self.visible
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+def main(argv=None):
+    from procedural_map.map_generator import generate_map
+    from enemies.flow_field import FlowField
+    from simulation import seed_arg  # simulation imports this module, so not at the top
+    parser = argparse.ArgumentParser(description="Benchmark the sharded enemy simulation")
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--enemies", type=int, default=100000)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--seed", type=seed_arg, default=1)
+    args = parser.parse_args(argv)
+    grid = generate_map(args.size, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    cells = rng.choice(grid.get_road_index(), args.enemies)
+    xs, ys = cells % args.size, cells // args.size
+    types = rng.integers(0, 3, args.enemies)
+    center = args.size // 2
+    field = FlowField(grid)
+    field.update(center, center)
+    player = _PlayerPos()
+    player.x = player.y = center
+    dt = 1.0 / 60
+    with ShardedEnemySystem(grid, args.shards, seed=args.seed, flow_field=field) as system:
+        system.add_many(types, xs, ys)
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            system.update(dt, player)
+        elapsed = time.perf_counter() - start
+    print(f"shards={args.shards} enemies={args.enemies} ticks={args.ticks} "
+          f"elapsed={elapsed:.3f}s ticks/s={args.ticks / elapsed:.1f}")
+
+if __name__ == "__main__":
+    main()
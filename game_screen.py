@@ -1,6 +1,11 @@
 
+import json
+import os
 import pygame
-from procedural_map.map_generator import generate_map, ROAD, FOREST, BORDER
+import numpy as np
+from procedural_map.grid import ROAD, FOREST, BORDER
+from procedural_map.cache_dir import DEFAULT_CACHE_DIR
+from profiler import PROFILER
 
 WIDTH, HEIGHT = 762, 439
 BORDER_COLOR = (200, 180, 150)
@@ -15,32 +20,140 @@ GAMEPLAY_SCREEN_RECT = pygame.Rect(160, 60, WIDTH-160, HEIGHT-60)  # Main area
 
 BORDER_WIDTH = 3
 
+# Terrain colors indexed by cell value; unknown values draw black
+TERRAIN_COLORS = {
+    ROAD: (180, 180, 80),    # road color
+    FOREST: (40, 120, 40),   # forest color
+    BORDER: (220, 0, 0),     # world border as red
+}
+TERRAIN_PALETTE = [TERRAIN_COLORS.get(i, (0, 0, 0)) for i in range(256)]
+# Largest pre-scaled terrain surface kept per zoom level (8-bit, so one byte per pixel)
+MAX_CACHED_PIXELS = 16_000_000
+# Fog over explored cells that are out of sight (0 = clear, 255 = black)
+FOG_EXPLORED_ALPHA = 150
+# Resolved font file paths, so system fonts are only scanned once per machine. Read at call
+# time, so tools like the benchmarks can point it somewhere else.
+FONT_CACHE_FILE = os.path.join(DEFAULT_CACHE_DIR, "fonts.json")
+
+def _read_font_cache():
+    try:
+        with open(FONT_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_font(name, size):
+    # Like pygame.font.SysFont, but the name -> file lookup is cached on disk
+    cache = _read_font_cache()
+    path = cache.get(name, "")
+    if path == "" or (path is not None and not os.path.exists(path)):
+        # match_font scans every installed font; None means use pygame's default font
+        path = pygame.font.match_font(name)
+        cache[name] = path
+        try:
+            os.makedirs(os.path.dirname(FONT_CACHE_FILE), exist_ok=True)
+            with open(FONT_CACHE_FILE, 'w') as f:
+                json.dump(cache, f)
+        except OSError:
+            pass
+    return pygame.font.Font(path, size)
+
+
+def terrain_surface(cells):
+    # One pixel per cell in a palette-indexed 8-bit surface
+    cells = np.asarray(cells, dtype=np.uint8)
+    h, w = cells.shape
+    surf = pygame.Surface((w, h), depth=8)
+    surf.set_palette(TERRAIN_PALETTE)
+    pygame.surfarray.blit_array(surf, cells.T)
+    return surf
 
 def draw_gameplay(surface, map_grid=None):
-    surface.fill(BG_COLOR)
-    # Draw procedural map full screen
-    if map_grid is not None:
-        map_size = len(map_grid)
-        cell_w = WIDTH / map_size
-        cell_h = HEIGHT / map_size
-        for y in range(map_size):
-            for x in range(map_size):
-                val = map_grid[y][x]
-                if val == ROAD:
-                    color = (180, 180, 80)  # road color
-                elif val == FOREST:
-                    color = (40, 120, 40)   # forest color
-                elif val == BORDER:
-                    color = (220, 0, 0)    # world border as red
-                else:
-                    color = (0,0,0)
-                rect = pygame.Rect(
-                    int(x * cell_w),
-                    int(y * cell_h),
-                    int(cell_w)+1,
-                    int(cell_h)+1
-                )
-                pygame.draw.rect(surface, color, rect)
+    with PROFILER.span("draw_gameplay"):
+        surface.fill(BG_COLOR)
+        # Draw procedural map full screen
+        if map_grid is not None:
+            # Rasterize the cells once and scale up, instead of one rect per cell
+            scaled = pygame.transform.scale(terrain_surface(map_grid), (WIDTH, HEIGHT))
+            surface.blit(scaled, (0, 0))
+
+class TerrainCache:
+    # Static terrain pre-rasterized once per zoom level; rebuilt only when the grid changes
+    def __init__(self):
+        self.grid = None
+        self.version = None
+        self.base = None
+        self.scaled = {}
+
+    def invalidate(self):
+        self.grid = None
+        self.version = None
+        self.base = None
+        self.scaled = {}
+
+    def surface_for(self, grid, viewport_size):
+        if grid is not self.grid or grid.version != self.version:
+            self.invalidate()
+            self.grid = grid
+            self.version = grid.version
+            self.base = terrain_surface(grid.cells)
+        scaled = self.scaled.get(viewport_size)
+        if scaled is None:
+            w = round(grid.size * WIDTH / viewport_size)
+            h = round(grid.size * HEIGHT / viewport_size)
+            if w * h > MAX_CACHED_PIXELS:
+                return None
+            scaled = pygame.transform.scale(self.base, (w, h))
+            self.scaled[viewport_size] = scaled
+        return scaled
+
+    def on_terrain_change(self, change):
+        # Repaint just the edited cell in the base and every scaled surface
+        if change.map_grid is not self.grid or self.version != change.version - 1:
+            return  # Not cached (or already stale): the next draw rebuilds from the grid
+        color = TERRAIN_PALETTE[change.new]
+        self.base.set_at((change.x, change.y), color)
+        size = self.grid.size
+        for scaled in self.scaled.values():
+            w, h = scaled.get_size()
+            # Pixels that nearest-neighbour scaling took from this cell
+            x0, x1 = -(-change.x * w // size), -(-(change.x + 1) * w // size)
+            y0, y1 = -(-change.y * h // size), -(-(change.y + 1) * h // size)
+            scaled.fill(color, (x0, y0, x1 - x0, y1 - y0))
+        self.version = change.version
+
+    def draw(self, surface, grid, x0, y0, viewport_size):
+        # Blit the camera window of the cached terrain; False if the grid can't be cached
+        if not hasattr(grid, 'cells'):
+            return False
+        scaled = self.surface_for(grid, viewport_size)
+        if scaled is None:
+            return False
+        surface.fill(BG_COLOR)
+        area = pygame.Rect(int(x0 * WIDTH / viewport_size), int(y0 * HEIGHT / viewport_size), WIDTH, HEIGHT)
+        surface.blit(scaled, (0, 0), area)
+        return True
+
+class FogLayer:
+    # Fog of war drawn over the cached terrain: one small alpha surface per FOV change, scaled up
+    def __init__(self):
+        self.key = None
+        self.scaled = None
+
+    def draw(self, surface, visibility, x0, y0, viewport_size):
+        key = (id(visibility), visibility.version, x0, y0, viewport_size)
+        if key != self.key:
+            visible = visibility.visible[y0:y0+viewport_size, x0:x0+viewport_size]
+            explored = visibility.explored[y0:y0+viewport_size, x0:x0+viewport_size]
+            alpha = np.where(visible, 0, np.where(explored, FOG_EXPLORED_ALPHA, 255)).astype(np.uint8)
+            fog = pygame.Surface((alpha.shape[1], alpha.shape[0]), pygame.SRCALPHA)
+            fog.fill((0, 0, 0, 255))
+            pixels = pygame.surfarray.pixels_alpha(fog)
+            pixels[:] = alpha.T
+            del pixels  # Unlock the surface
+            self.scaled = pygame.transform.scale(fog, (WIDTH, HEIGHT))
+            self.key = key
+        surface.blit(self.scaled, (0, 0))
 
 def draw_ui(surface):
     # Draw container borders only
@@ -53,7 +166,7 @@ def draw_ui(surface):
 
 # For testing layout independently
 if __name__ == "__main__":
-    pygame.init()
+    pygame.display.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Game Layout Test")
     clock = pygame.time.Clock()
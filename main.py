@@ -1,23 +1,31 @@
 
 # Simple pygame menu and game
-import pygame
-import sys
-from game_screen import draw_gameplay, draw_ui, WIDTH, HEIGHT
-from procedural_map.map_generator import generate_map
-from player import Player
-import random
-from enemies.wanderer import WandererEnemy
-from enemies.follower import FollowerEnemy
-from enemies.hunter import HunterEnemy
-
-pygame.init()
+import time
+# Startup phases as (name, end time) for --profile-startup; the first entry is the start
+STARTUP = [("start", time.perf_counter())]
 
+def mark_startup(phase):
+    STARTUP.append((phase, time.perf_counter()))
 
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Text-Based Game Menu")
+import pygame
+mark_startup("import pygame")
+import sys
+import argparse
+import os
+from game_screen import draw_gameplay, draw_ui, load_font, TerrainCache, FogLayer, WIDTH, HEIGHT
+from procedural_map.chunked_world import ChunkedWorld
+from procedural_map.map_cache import MapCache
+from session_loader import SessionLoader
+from profiler import PROFILER, FRAME_SPAN
+from savegame import save_game, load_game
+from replay import Recorder
+from simulation import MAX_ENEMIES, seed_arg
+mark_startup("import game modules")
 
-FONT = pygame.font.SysFont("Arial", 28)
-SMALL_FONT = pygame.font.SysFont("Arial", 20)
+# Window and fonts are created by init_display(), not on import
+WIN = None
+FONT = None
+SMALL_FONT = None
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -51,13 +59,35 @@ class Game:
         self.overlay_active = False
         self.map_grid = None
         self.map_size = 128  # Larger map size
+        self.world_mode = "finite"  # "finite" single map or "chunked" lazily generated world
+        self.map_seed = None  # Fixed seed (maps are then cached on disk); None picks a new one per game
+        self.seed = None  # Seed of the current map
+        self.map_cache = MapCache()
+        # Sessions are built off the UI thread; the next one is prefetched while playing
+        self.loader = SessionLoader(self.map_cache)
+        self.load_job = None
+        self.terrain_cache = TerrainCache()
+        self.fog_enabled = True  # Fog of war outside the player's field of view (finite maps)
+        self.fog_layer = FogLayer()
+        self.redraw_mode = "full"  # "full" redraws every frame, "dirty" only changed regions
+        self.last_snapshot = None
+        self.force_redraw = True
+        self.edited_cells = []  # terrain cells edited since the last repaint
         self.camera_x = self.map_size // 2
         self.camera_y = self.map_size // 2
         self.zoom_levels = [24, 34, 48, 64, 96, 128]
         self.zoom_index = 0
+        self.sim = None  # Simulation of the current session
         self.player = None
+        self.flow_field = None
+        self.enemy_system = None
+        self.spatial_index = None  # Player and enemy positions for culling and proximity queries
         self.create_menu_buttons()
         self.show_ui = False  # UI toggle state
+        self.show_profiler = False  # F3 frame-time overlay
+        self.profile_out = None  # Profile dump written on exit (*.trace.json for Chrome trace)
+        self.save_file = "quicksave.sav"  # F5 saves the session here, F9 restores it
+        self.record_path = None  # Record each new session for replay.py; the last one is kept
 
     def create_menu_buttons(self):
         self.buttons = [
@@ -69,7 +99,9 @@ class Game:
     def create_settings_buttons(self):
         self.buttons = [
             Button(f"Toggle Setting ({'ON' if self.toggle_setting else 'OFF'})", 120, 120, 260, 40, self.toggle_placeholder),
-            Button("Back to Menu", 180, 200, 140, 40, self.back_to_menu)
+            Button(f"World: {self.world_mode.capitalize()}", 120, 170, 260, 40, self.toggle_world_mode),
+            Button(f"Fog of War ({'ON' if self.fog_enabled else 'OFF'})", 120, 220, 260, 40, self.toggle_fog),
+            Button("Back to Menu", 180, 280, 140, 40, self.back_to_menu)
         ]
 
     def create_game_buttons(self):
@@ -91,38 +123,45 @@ class Game:
         ]
 
     def start_game(self):
+        # Show a loading screen until the worker has built the session
+        self.state = "loading"
+        self.buttons = []
+        self.overlay_active = False
+        self.load_job = self.loader.load(self.map_size, self.world_mode, self.map_seed)
+        # A finished prefetch starts the game without a single loading frame
+        self.update_loading()
+
+    def update_loading(self):
+        # Called every frame while loading; switches to the game once the session is ready
+        if self.state != "loading" or not self.load_job.done():
+            return
+        job, self.load_job = self.load_job, None
+        self.begin_session(job.result())
+        if self.record_path:
+            # Only fresh sessions can be replayed from their seed, so loaded saves aren't recorded
+            self.sim.recorder = Recorder(self.sim, self.map_size, self.world_mode, MAX_ENEMIES)
+        self.loader.prefetch(self.map_size, self.world_mode, self.map_seed)
+
+    def begin_session(self, sim):
         self.state = "game"
         self.create_game_buttons()
-        self.overlay_active = False
-        self.map_grid = generate_map(self.map_size)
-        self.camera_x = self.map_size // 2
-        self.camera_y = self.map_size // 2
+        self.sim = sim
+        self.seed = sim.seed
+        # The game reads the session state straight from the simulation
+        self.map_grid = self.sim.map_grid
+        self.player = self.sim.player
+        self.flow_field = self.sim.flow_field
+        self.enemy_system = self.sim.enemy_system
+        self.spatial_index = self.sim.spatial_index
+        self.enemies = self.sim.enemies
+        if self.sim.terrain:
+            # Edits patch the cached terrain and repaint only their cell
+            self.sim.terrain.subscribe(self.terrain_cache.on_terrain_change)
+            self.sim.terrain.subscribe(self.on_terrain_change)
+        # Camera starts on the player (the map center for new sessions)
+        self.camera_x = self.player.x
+        self.camera_y = self.player.y
         self.zoom_index = 0
-        self.player = Player(self.map_grid)
-        # Spawn up to 10 enemies with type percentages
-        self.enemies = []
-        self.enemy_timers = []
-        road_cells = [(x, y) for y in range(self.map_size) for x in range(self.map_size) if self.map_grid[y][x] == 0 and (x, y) != (self.player.x, self.player.y)]
-        random.shuffle(road_cells)
-        max_enemies = min(10, len(road_cells))
-        # Percentages: 40% wanderer, 30% follower, 30% hunter
-        num_wanderer = int(max_enemies * 0.4)
-        num_follower = int(max_enemies * 0.3)
-        num_hunter = max_enemies - num_wanderer - num_follower
-        # Always spawn exactly max_enemies
-        spawn_types = (['wanderer'] * num_wanderer + ['follower'] * num_follower + ['hunter'] * num_hunter)
-        random.shuffle(spawn_types)
-        for etype in spawn_types:
-            if road_cells:
-                x, y = road_cells.pop()
-                if etype == 'wanderer':
-                    enemy = WandererEnemy(self.map_grid, x, y)
-                elif etype == 'follower':
-                    enemy = FollowerEnemy(self.map_grid, x, y)
-                else:
-                    enemy = HunterEnemy(self.map_grid, x, y)
-                self.enemies.append(enemy)
-                self.enemy_timers.append({'type': etype, 'last_move': 0})
 
     def open_settings(self):
         self.state = "settings"
@@ -141,48 +180,164 @@ class Game:
         self.toggle_setting = not self.toggle_setting
         self.create_settings_buttons()
 
+    def toggle_world_mode(self):
+        self.world_mode = "chunked" if self.world_mode == "finite" else "finite"
+        self.create_settings_buttons()
+        # Have the next Start build the chosen mode in the background already
+        self.loader.prefetch(self.map_size, self.world_mode, self.map_seed)
+
+    def toggle_fog(self):
+        self.fog_enabled = not self.fog_enabled
+        self.create_settings_buttons()
+
+    def fog(self):
+        # Visibility to mask the view with, or None when the whole map is shown
+        if self.fog_enabled and self.sim:
+            return self.sim.visibility
+        return None
+
     def confirm_exit(self):
+        self.shutdown()
         pygame.quit()
         sys.exit()
 
+    def shutdown(self):
+        self.loader.shutdown()
+        if self.record_path and self.sim and self.sim.recorder:
+            self.sim.recorder.save(self.record_path)
+        if self.profile_out:
+            PROFILER.dump(self.profile_out)
+
     def cancel_exit(self):
         self.back_to_menu()
 
-    def draw(self, win):
+    def viewport(self):
+        # Camera/viewport logic: (viewport_size, half_vp, cam_x, cam_y) clamped to the map
+        viewport_size = self.zoom_levels[self.zoom_index]
+        half_vp = viewport_size // 2
+        map_size = len(self.map_grid) if self.map_grid else self.map_size
+        cam_x = max(half_vp, min(self.camera_x, map_size - half_vp - 1))
+        cam_y = max(half_vp, min(self.camera_y, map_size - half_vp - 1))
+        return viewport_size, half_vp, cam_x, cam_y
+
+    def on_terrain_change(self, change):
+        self.edited_cells.append((change.x, change.y))
+
+    def screen_to_cell(self, pos):
+        # Map cell under a screen position in the current viewport
+        viewport_size, half_vp, cam_x, cam_y = self.viewport()
+        return (cam_x - half_vp + int(pos[0] * viewport_size / WIDTH),
+                cam_y - half_vp + int(pos[1] * viewport_size / HEIGHT))
+
+    def cell_rect(self, x, y):
+        # Screen rect covering map cell (x, y) in the current viewport
+        viewport_size, half_vp, cam_x, cam_y = self.viewport()
+        cell_w = WIDTH / viewport_size
+        cell_h = HEIGHT / viewport_size
+        return pygame.Rect(int((x - (cam_x-half_vp)) * cell_w), int((y - (cam_y-half_vp)) * cell_h), int(cell_w)+2, int(cell_h)+2)
+
+    def visible_entities(self):
+        # Player and enemies inside the current viewport
+        if not self.map_grid:
+            return []
+        viewport_size, half_vp, cam_x, cam_y = self.viewport()
+        entities = self.spatial_index.query_rect(cam_x-half_vp, cam_y-half_vp, cam_x+half_vp, cam_y+half_vp)
+        fog = self.fog()
+        if fog is not None:
+            # Enemies under the fog stay hidden
+            entities = [e for e in entities if e is self.player or fog.can_see(e.x, e.y)]
+        return entities
+
+    def frame_snapshot(self):
+        # Everything that affects the frame: a scene key (any change repaints all) and visible entity cells
+        scene = (self.state, self.overlay_active, self.show_ui, tuple(btn.text for btn in self.buttons))
+        entities = {}
+        if self.state == "loading":
+            # Repaint only when the bar grows by a visible step
+            scene += (int(self.load_job.progress * 100),)
         if self.state == "game":
-            # Camera/viewport logic
-            viewport_size = self.zoom_levels[self.zoom_index]
-            half_vp = viewport_size // 2
-            cam_x = max(half_vp, min(self.camera_x, self.map_size - half_vp - 1))
-            cam_y = max(half_vp, min(self.camera_y, self.map_size - half_vp - 1))
-            # Extract viewport
-            if self.map_grid:
-                if viewport_size == self.map_size:
-                    vp_grid = self.map_grid
-                else:
-                    vp_grid = [row[cam_x-half_vp:cam_x+half_vp] for row in self.map_grid[cam_y-half_vp:cam_y+half_vp]]
-            else:
-                vp_grid = None
-            draw_gameplay(win, vp_grid)
-            # Draw enemies and player (full screen coordinates)
-            cell_w = WIDTH / viewport_size
-            cell_h = HEIGHT / viewport_size
-            if hasattr(self, 'enemies'):
-                for enemy in self.enemies:
-                    ex, ey = enemy.x, enemy.y
-                    if cam_x-half_vp <= ex < cam_x+half_vp and cam_y-half_vp <= ey < cam_y+half_vp:
-                        draw_x = int((ex - (cam_x-half_vp)) * cell_w)
-                        draw_y = int((ey - (cam_y-half_vp)) * cell_h)
-                        center_color, outer_color = enemy.get_color()
-                        pygame.draw.circle(win, outer_color, (draw_x+cell_w//2, draw_y+cell_h//2), int(min(cell_w,cell_h)//2.2))
-                        pygame.draw.circle(win, center_color, (draw_x+cell_w//2, draw_y+cell_h//2), int(min(cell_w,cell_h)//3.5))
-            if self.player:
-                px, py = self.player.x, self.player.y
-                if cam_x-half_vp <= px < cam_x+half_vp and cam_y-half_vp <= py < cam_y+half_vp:
-                    draw_x = int((px - (cam_x-half_vp)) * cell_w)
-                    draw_y = int((py - (cam_y-half_vp)) * cell_h)
-                    pygame.draw.circle(win, (60,60,60), (draw_x+cell_w//2, draw_y+cell_h//2), int(min(cell_w,cell_h)//2.2))
-                    pygame.draw.circle(win, (0,0,0), (draw_x+cell_w//2, draw_y+cell_h//2), int(min(cell_w,cell_h)//3.5))
+            # Terrain edits are repainted per cell from edited_cells, so the grid version isn't here
+            scene += (self.viewport(), id(self.map_grid))
+            fog = self.fog()
+            if fog is not None:
+                scene += (fog.version,)
+            entities = {entity: (entity.x, entity.y) for entity in self.visible_entities()}
+        return scene, entities
+
+    def dirty_rects(self):
+        # Screen regions changed since the previous call; empty when nothing moved
+        snapshot = self.frame_snapshot()
+        previous, self.last_snapshot = self.last_snapshot, snapshot
+        screen = pygame.Rect(0, 0, WIDTH, HEIGHT)
+        edited, self.edited_cells = self.edited_cells, []
+        if self.force_redraw or previous is None or previous[0] != snapshot[0]:
+            self.force_redraw = False
+            return [screen]
+        old_cells, new_cells = previous[1], snapshot[1]
+        rects = []
+        for cell in edited:
+            rect = self.cell_rect(*cell).clip(screen)
+            if rect.width and rect.height:
+                rects.append(rect)
+        for entity in old_cells.keys() | new_cells.keys():
+            old, new = old_cells.get(entity), new_cells.get(entity)
+            if old != new:
+                for cell in (old, new):
+                    if cell is not None:
+                        rect = self.cell_rect(*cell).clip(screen)
+                        if rect.width and rect.height:
+                            rects.append(rect)
+        return rects
+
+    def draw(self, win, only_if_changed=False):
+        # Returns the changed screen rects; with only_if_changed an unchanged frame is skipped
+        rects = self.dirty_rects()
+        if only_if_changed:
+            if not rects:
+                return rects
+            win.set_clip(rects[0].unionall(rects[1:]))
+        self.draw_frame(win)
+        win.set_clip(None)
+        return rects
+
+    def draw_frame(self, win):
+        if self.state == "game":
+            viewport_size, half_vp, cam_x, cam_y = self.viewport()
+            map_size = len(self.map_grid) if self.map_grid else self.map_size
+            with PROFILER.span("draw_terrain"):
+                # Cached terrain when possible, otherwise rasterize the extracted viewport
+                if not (self.map_grid and self.terrain_cache.draw(win, self.map_grid, cam_x-half_vp, cam_y-half_vp, viewport_size)):
+                    if self.map_grid:
+                        if viewport_size == map_size:
+                            vp_grid = self.map_grid.cells
+                        else:
+                            vp_grid = self.map_grid.window(cam_x-half_vp, cam_y-half_vp, 2*half_vp, 2*half_vp)
+                    else:
+                        vp_grid = None
+                    draw_gameplay(win, vp_grid)
+                fog = self.fog()
+                if fog is not None:
+                    self.fog_layer.draw(win, fog, cam_x-half_vp, cam_y-half_vp, viewport_size)
+            with PROFILER.span("draw_entities"):
+                # Draw enemies and player (full screen coordinates)
+                cell_w = WIDTH / viewport_size
+                cell_h = HEIGHT / viewport_size
+                if hasattr(self, 'enemies'):
+                    for enemy in self.visible_entities():
+                        if enemy is not self.player:
+                            ex, ey = enemy.x, enemy.y
+                            draw_x = int((ex - (cam_x-half_vp)) * cell_w)
+                            draw_y = int((ey - (cam_y-half_vp)) * cell_h)
+                            center_color, outer_color = enemy.get_color()
+                            pygame.draw.circle(win, outer_color, (draw_x+cell_w//2, draw_y+cell_h//2), int(min(cell_w,cell_h)//2.2))
+                            pygame.draw.circle(win, center_color, (draw_x+cell_w//2, draw_y+cell_h//2), int(min(cell_w,cell_h)//3.5))
+                if self.player:
+                    px, py = self.player.x, self.player.y
+                    if cam_x-half_vp <= px < cam_x+half_vp and cam_y-half_vp <= py < cam_y+half_vp:
+                        draw_x = int((px - (cam_x-half_vp)) * cell_w)
+                        draw_y = int((py - (cam_y-half_vp)) * cell_h)
+                        pygame.draw.circle(win, (60,60,60), (draw_x+cell_w//2, draw_y+cell_h//2), int(min(cell_w,cell_h)//2.2))
+                        pygame.draw.circle(win, (0,0,0), (draw_x+cell_w//2, draw_y+cell_h//2), int(min(cell_w,cell_h)//3.5))
             # Draw UI if toggled
             if self.show_ui:
                 draw_ui(win)
@@ -205,10 +360,58 @@ class Game:
         elif self.state == "exit":
             txt = FONT.render("Exit Game?", True, BLUE)
             win.blit(txt, (WIDTH//2-txt.get_width()//2, 100))
+        elif self.state == "loading":
+            txt = FONT.render("Generating map...", True, BLUE)
+            win.blit(txt, (WIDTH//2-txt.get_width()//2, 100))
+            bar = pygame.Rect(WIDTH//2-150, 180, 300, 24)
+            fill = bar.inflate(-4, -4)
+            fill.width = int(fill.width * self.load_job.progress)
+            pygame.draw.rect(win, BLUE, fill)
+            pygame.draw.rect(win, BLACK, bar, 2)
         for btn in self.buttons:
             btn.draw(win)
 
+    def toggle_profiler(self):
+        self.show_profiler = not self.show_profiler
+        # Keep recording without the overlay when a dump was asked for
+        PROFILER.enabled = self.show_profiler or bool(self.profile_out)
+        self.force_redraw = True
+
+    def draw_profiler(self, win):
+        # Frame-time percentiles and per-span means over the buffered frames; returns the rect drawn
+        stats = PROFILER.frame_percentiles()
+        lines = ["frame ms  " + "  ".join(f"{k} {v:.2f}" for k, v in stats.items()) if stats else "frame ms  -"]
+        for name, (count, mean, worst) in sorted(PROFILER.span_stats().items()):
+            if name != FRAME_SPAN:
+                lines.append(f"{name:<15} {mean:6.2f} avg {worst:6.2f} max")
+        texts = [SMALL_FONT.render(line, True, WHITE) for line in lines]
+        rect = pygame.Rect(4, 4, max(t.get_width() for t in texts) + 8, sum(t.get_height() for t in texts) + 8)
+        win.fill(BLACK, rect)
+        y = rect.y + 4
+        for txt in texts:
+            win.blit(txt, (rect.x + 4, y))
+            y += txt.get_height()
+        return rect
+
+    def quick_save(self):
+        if self.state == "game" and self.sim:
+            save_game(self.sim, self.save_file)
+
+    def quick_load(self):
+        if self.state != "loading" and os.path.exists(self.save_file):
+            self.begin_session(load_game(self.save_file))
+            self.overlay_active = False
+
     def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.toggle_profiler()
+            return
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+            self.quick_save()
+            return
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+            self.quick_load()
+            return
         if self.state == "game":
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_TAB:
@@ -219,35 +422,44 @@ class Game:
                     # Player movement (Arrow keys and WASD)
                     if event.key == pygame.K_LEFT:
                         if self.player:
-                            self.player.move(-1, 0)
+                            self.sim.move_player(-1, 0)
                     elif event.key == pygame.K_RIGHT:
                         if self.player:
-                            self.player.move(1, 0)
+                            self.sim.move_player(1, 0)
                     elif event.key == pygame.K_UP:
                         if self.player:
-                            self.player.move(0, -1)
+                            self.sim.move_player(0, -1)
                     elif event.key == pygame.K_DOWN:
                         if self.player:
-                            self.player.move(0, 1)
+                            self.sim.move_player(0, 1)
                     elif event.key == pygame.K_BACKQUOTE:
                         self.zoom_index = (self.zoom_index + 1) % len(self.zoom_levels)
                     # WASD also moves player
                     elif event.key == pygame.K_w:
                         if self.player:
-                            self.player.move(0, -1)
+                            self.sim.move_player(0, -1)
                     elif event.key == pygame.K_s:
                         if self.player:
-                            self.player.move(0, 1)
+                            self.sim.move_player(0, 1)
                     elif event.key == pygame.K_a:
                         if self.player:
-                            self.player.move(-1, 0)
+                            self.sim.move_player(-1, 0)
                     elif event.key == pygame.K_d:
                         if self.player:
-                            self.player.move(1, 0)
+                            self.sim.move_player(1, 0)
                 # Camera always follows player
                 if self.player:
                     self.camera_x = self.player.x
                     self.camera_y = self.player.y
+                    if isinstance(self.map_grid, ChunkedWorld):
+                        self.map_grid.ensure_around(self.camera_x, self.camera_y)
+            elif event.type == pygame.MOUSEBUTTONDOWN and not self.overlay_active and self.sim.terrain:
+                # Left click digs a road, right click blocks it with forest
+                x, y = self.screen_to_cell(event.pos)
+                if event.button == 1:
+                    self.sim.dig(x, y)
+                elif event.button == 3:
+                    self.sim.block(x, y)
             elif event.type == pygame.KEYUP:
                 if event.key == pygame.K_TAB:
                     self.show_ui = False
@@ -255,40 +467,104 @@ class Game:
             for btn in self.buttons:
                 btn.handle_event(event)
 
+def init_display():
+    # Only the subsystems the game uses; pygame.init() would also start audio and joysticks
+    global WIN, FONT, SMALL_FONT
+    pygame.display.init()
+    pygame.font.init()
+    mark_startup("pygame init")
+    WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Text-Based Game Menu")
+    mark_startup("window")
+    FONT = load_font("Arial", 28)
+    SMALL_FONT = load_font("Arial", 20)
+    mark_startup("fonts")
+    return WIN
+
+def report_startup(map_ready=None, out=sys.stderr):
+    # Time spent in each startup phase since the previous one
+    start = STARTUP[0][1]
+    print("startup phase            ms", file=out)
+    for (_, prev), (phase, end) in zip(STARTUP, STARTUP[1:]):
+        print(f"  {phase:<20} {(end - prev) * 1000:8.1f}", file=out)
+    print(f"  {'total':<20} {(STARTUP[-1][1] - start) * 1000:8.1f}", file=out)
+    if map_ready is not None:
+        # Built on the loader thread alongside the phases above
+        print(f"first map ready after {(map_ready - start) * 1000:.1f} ms (background)", file=out)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Procedural map demo")
+    parser.add_argument("--seed", type=seed_arg, default=None, help="fixed map seed (maps are cached on disk)")
+    parser.add_argument("--redraw", choices=["full", "dirty"], default="full",
+                        help="'dirty' only repaints changed regions and skips unchanged frames")
+    parser.add_argument("--save-file", default="quicksave.sav", help="quick save slot (F5 saves, F9 loads)")
+    parser.add_argument("--record", default=None, help="record the session for 'python replay.py FILE'")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each startup phase took once the first map is ready")
+    parser.add_argument("--profile", action="store_true", help="record frame profile spans from the start (F3 shows them)")
+    parser.add_argument("--profile-out", default=None,
+                        help="write the profile on exit; *.trace.json gives a Chrome trace, else plain JSON")
+    return parser.parse_args(argv)
+
 def main():
-    clock = pygame.time.Clock()
+    args = parse_args()
     game = Game()
+    game.map_seed = args.seed
+    game.redraw_mode = args.redraw
+    game.profile_out = args.profile_out
+    game.save_file = args.save_file
+    game.record_path = args.record
+    PROFILER.enabled = args.profile or bool(args.profile_out)
+    # Start building the first session before the window exists; it finishes while the menu shows
+    game.loader.prefetch(game.map_size, game.world_mode, game.map_seed)
+    first_job = game.loader.prefetched
+    mark_startup("start map prefetch")
+    init_display()
+    clock = pygame.time.Clock()
+    first_frame = True
+    startup_pending = args.profile_startup
     while True:
         dt = clock.tick(60) / 1000.0  # seconds since last frame
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            game.handle_event(event)
-        # Update enemies with timers
-        if hasattr(game, 'enemies') and hasattr(game, 'enemy_timers'):
-            for idx, enemy in enumerate(game.enemies):
-                timer = game.enemy_timers[idx]
-                timer['last_move'] += dt
-                # Set movement interval by type
-                if timer['type'] == 'wanderer':
-                    interval = 1.0  # medium/default
-                elif timer['type'] == 'follower':
-                    interval = 1.5  # slow
-                elif timer['type'] == 'hunter':
-                    interval = 0.6  # fast
-                else:
-                    interval = 1.0
-                if timer['last_move'] >= interval:
-                    if enemy.__class__.__name__ == 'WandererEnemy':
-                        enemy.move()
-                    elif enemy.__class__.__name__ == 'FollowerEnemy':
-                        enemy.move(game.player)
-                    elif enemy.__class__.__name__ == 'HunterEnemy':
-                        enemy.move(game.player)
-                    timer['last_move'] = 0
-        game.draw(WIN)
-        pygame.display.update()
+        events = pygame.event.get()
+        if game.redraw_mode == "dirty" and game.state not in ("game", "loading") and not events and not game.show_profiler:
+            # Menus only change on input, so sleep until the next event
+            events = [pygame.event.wait()]
+        # Frame span covers the work of one frame, not the clock.tick sleep
+        with PROFILER.span(FRAME_SPAN):
+            for event in events:
+                if event.type == pygame.QUIT:
+                    game.shutdown()
+                    pygame.quit()
+                    sys.exit()
+                if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    game.force_redraw = True
+                with PROFILER.span("handle_event"):
+                    game.handle_event(event)
+            game.update_loading()
+            # Advance the simulation in fixed timesteps
+            if game.sim and game.state == "game":
+                with PROFILER.span("sim_update"):
+                    game.sim.advance(dt)
+            if game.redraw_mode == "dirty":
+                rects = game.draw(WIN, only_if_changed=True)
+            else:
+                game.draw(WIN)
+                rects = None
+            if game.show_profiler:
+                overlay = game.draw_profiler(WIN)
+                if rects is not None:
+                    rects = rects + [overlay]
+            with PROFILER.span("display_update"):
+                if rects is None:
+                    pygame.display.update()
+                elif rects:
+                    pygame.display.update(rects)
+        if first_frame:
+            first_frame = False
+            mark_startup("first frame")
+        if startup_pending and not first_frame and first_job.finished is not None:
+            startup_pending = False
+            report_startup(map_ready=first_job.finished)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,125 @@
+# Thin client: mirrors the server's map chunks and entity positions, sends player moves
+#
+# Run from the repository root against a running net.server:
+#   python -m net.client --port 8765 --duration 10
+import argparse
+import asyncio
+import random
+import numpy as np
+from net import protocol
+
+UNKNOWN = 255  # cells no chunk has covered yet
+
+class ThinClient:
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.client_id = None
+        self.player_id = None
+        self.tick_rate = None
+        self.chunk_size = None
+        self.grid = None
+        self.entities = {}  # entity id -> (x, y)
+        self.tick = 0
+        # Measurements
+        self.bytes_received = 0
+        self.chunks_received = 0
+        self.ticks_received = 0
+        self.latencies_ns = []
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(protocol.frame(protocol.HELLO))
+        msg_type, payload = await protocol.read_frame(self.reader)
+        if msg_type != protocol.WELCOME:
+            raise protocol.ProtocolError("expected WELCOME")
+        self.bytes_received += len(payload) + 5
+        self.client_id, self.player_id, size, self.chunk_size, self.tick_rate = protocol.decode_welcome(payload)
+        self.grid = np.full((size, size), UNKNOWN, dtype=np.uint8)
+
+    @property
+    def position(self):
+        return self.entities.get(self.player_id)
+
+    def handle(self, msg_type, payload):
+        if msg_type == protocol.CHUNK:
+            cx, cy, cells = protocol.decode_chunk(payload)
+            h, w = cells.shape
+            y0, x0 = cy * self.chunk_size, cx * self.chunk_size
+            self.grid[y0:y0+h, x0:x0+w] = cells
+            self.chunks_received += 1
+        elif msg_type == protocol.TICK:
+            tick, sent, ids, xs, ys = protocol.decode_tick(payload)
+            self.latencies_ns.append(protocol.now_ns() - sent)
+            self.entities.update(zip(ids.tolist(), zip(xs.tolist(), ys.tolist())))
+            self.tick = tick
+            self.ticks_received += 1
+        elif msg_type == protocol.LEAVE:
+            self.entities.pop(protocol.decode_leave(payload), None)
+
+    async def receive(self):
+        # Apply server frames until the connection closes
+        try:
+            while True:
+                msg_type, payload = await protocol.read_frame(self.reader)
+                self.bytes_received += len(payload) + 5
+                self.handle(msg_type, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def move(self, dx, dy):
+        self.writer.write(protocol.encode_move(dx, dy))
+
+    async def wander(self, moves_per_second, rng):
+        # Random walk along roads the client knows about
+        while True:
+            await asyncio.sleep(1.0 / moves_per_second)
+            pos = self.position
+            if pos is None:
+                continue
+            steps = [(dx, dy) for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))
+                     if self.grid[pos[1] + dy, pos[0] + dx] == 0]
+            if steps:
+                self.move(*rng.choice(steps))
+
+    async def run(self, duration, moves_per_second=5.0, rng=None):
+        rng = rng or random.Random()
+        receiving = asyncio.ensure_future(self.receive())
+        walking = asyncio.ensure_future(self.wander(moves_per_second, rng))
+        try:
+            await asyncio.wait([receiving], timeout=duration)
+        finally:
+            walking.cancel()
+            receiving.cancel()
+            self.close()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def latency_stats(latencies_ns):
+    if not latencies_ns:
+        return {}
+    ms = np.asarray(latencies_ns) / 1e6
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p99_ms': float(np.percentile(ms, 99)),
+            'max_ms': float(ms.max())}
+
+async def _run(args):
+    client = ThinClient()
+    await client.connect(args.host, args.port)
+    await client.run(args.duration, args.moves_per_second)
+    known = int((client.grid != UNKNOWN).sum())
+    print(f"client {client.client_id}: {client.ticks_received} ticks, {client.chunks_received} chunks, "
+          f"{client.bytes_received / args.duration / 1024:.1f} KiB/s, {known} cells known, "
+          f"{len(client.entities)} entities, latency {latency_stats(client.latencies_ns)}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Connect one thin client and report what it received")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--moves-per-second", type=float, default=5.0)
+    asyncio.run(_run(parser.parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Load generator: many thin clients in one process against a session server
+#
+# Run from the repository root (starts its own server unless --port is given):
+#   python -m net.loadgen --clients 300 --duration 20
+import argparse
+import asyncio
+import random
+import socket
+import subprocess
+import sys
+import time
+import numpy as np
+from net.client import ThinClient, latency_stats
+from simulation import seed_arg
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port, size, enemies, tick_rate, seed):
+    # Server in its own process, so clients and server don't share one event loop
+    proc = subprocess.Popen([sys.executable, "-m", "net.server", "--port", str(port), "--size", str(size),
+                             "--enemies", str(enemies), "--tick-rate", str(tick_rate), "--seed", str(seed)])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+async def run_load(host, port, clients, duration, moves_per_second, seed=0):
+    rng = random.Random(seed)
+    conns = []
+    for _ in range(clients):
+        client = ThinClient()
+        await client.connect(host, port)
+        conns.append(client)
+    await asyncio.gather(*(c.run(duration, moves_per_second, random.Random(rng.random())) for c in conns))
+    return conns
+
+def report(conns, duration):
+    received = np.array([c.bytes_received for c in conns], dtype=np.float64)
+    latencies = [ns for c in conns for ns in c.latencies_ns]
+    ticks = np.array([c.ticks_received for c in conns])
+    return {
+        'clients': len(conns),
+        'total_kib_per_s': float(received.sum() / duration / 1024),
+        'per_client_kib_per_s': float(received.mean() / duration / 1024),
+        'ticks_per_client': float(ticks.mean()),
+        'chunks_per_client': float(np.mean([c.chunks_received for c in conns])),
+        'tick_latency': latency_stats(latencies),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure bandwidth and tick latency with many clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="existing server (default: start one)")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--moves-per-second", type=float, default=5.0)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--enemies", type=int, default=100)
+    parser.add_argument("--tick-rate", type=int, default=30)
+    parser.add_argument("--seed", type=seed_arg, default=1)
+    args = parser.parse_args(argv)
+    proc = None
+    port = args.port
+    if port is None:
+        port = _free_port()
+        proc = start_server(port, args.size, args.enemies, args.tick_rate, args.seed)
+    try:
+        conns = asyncio.run(run_load(args.host, port, args.clients, args.duration, args.moves_per_second, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    for key, value in report(conns, args.duration).items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Wire protocol: length-prefixed binary frames, little-endian
+#
+# Frame: u32 length of the rest | u8 message type | payload
+#   HELLO    c->s  (empty)
+#   WELCOME  s->c  client id, player entity id, map size, chunk size, tick rate
+#   CHUNK    s->c  chunk x, chunk y, width, height, cells packed 2 bits each
+#   TICK     s->c  tick, server send time (ns), n, entity ids u32[n], xs i32[n], ys i32[n]
+#   MOVE     c->s  dx, dy (one step along an axis)
+#   LEAVE    s->c  entity id of a player that disconnected
+import struct
+import time
+import numpy as np
+from procedural_map.grid import pack_cells, unpack_cells
+
+HELLO = 1
+WELCOME = 2
+CHUNK = 3
+TICK = 4
+MOVE = 5
+LEAVE = 6
+
+FRAME_HEADER = struct.Struct('<IB')
+WELCOME_MSG = struct.Struct('<IIIHH')
+CHUNK_MSG = struct.Struct('<iiHH')
+TICK_MSG = struct.Struct('<IQI')
+MOVE_MSG = struct.Struct('<bb')
+LEAVE_MSG = struct.Struct('<I')
+MAX_FRAME = 1 << 24
+# Entity ids: enemies use their index, players are offset so the ranges never meet
+PLAYER_ID_BASE = 1 << 24
+
+class ProtocolError(Exception):
+    pass
+
+def now_ns():
+    # Clock shared by every process on the box, so latency can be measured across processes
+    return time.monotonic_ns()
+
+def frame(msg_type, payload=b''):
+    return FRAME_HEADER.pack(len(payload) + 1, msg_type) + payload
+
+async def read_frame(reader):
+    # (message type, payload memoryview); raises asyncio.IncompleteReadError on disconnect
+    header = await reader.readexactly(4)
+    (length,) = struct.unpack('<I', header)
+    if not 1 <= length <= MAX_FRAME:
+        raise ProtocolError(f"bad frame length {length}")
+    body = await reader.readexactly(length)
+    return body[0], memoryview(body)[1:]
+
+def encode_welcome(client_id, player_id, size, chunk_size, tick_rate):
+    return frame(WELCOME, WELCOME_MSG.pack(client_id, player_id, size, chunk_size, tick_rate))
+
+def decode_welcome(payload):
+    return WELCOME_MSG.unpack(payload)
+
+def encode_chunk(cx, cy, cells):
+    h, w = cells.shape
+    return frame(CHUNK, CHUNK_MSG.pack(cx, cy, w, h) + pack_cells(cells).tobytes())
+
+def decode_chunk(payload):
+    cx, cy, w, h = CHUNK_MSG.unpack_from(payload)
+    return cx, cy, unpack_cells(payload, h, w, offset=CHUNK_MSG.size)
+
+def encode_tick(tick, ids, xs, ys):
+    n = len(ids)
+    return frame(TICK, b''.join([
+        TICK_MSG.pack(tick, now_ns(), n),
+        np.asarray(ids, dtype='<u4').tobytes(),
+        np.asarray(xs, dtype='<i4').tobytes(),
+        np.asarray(ys, dtype='<i4').tobytes(),
+    ]))
+
+def decode_tick(payload):
+    # (tick, sent ns, ids, xs, ys); the arrays are views into the payload
+    tick, sent, n = TICK_MSG.unpack_from(payload)
+    offset = TICK_MSG.size
+    ids = np.frombuffer(payload, dtype='<u4', count=n, offset=offset)
+    xs = np.frombuffer(payload, dtype='<i4', count=n, offset=offset + 4 * n)
+    ys = np.frombuffer(payload, dtype='<i4', count=n, offset=offset + 8 * n)
+    return tick, sent, ids, xs, ys
+
+def encode_move(dx, dy):
+    return frame(MOVE, MOVE_MSG.pack(dx, dy))
+
+def decode_move(payload):
+    if len(payload) != MOVE_MSG.size:
+        raise ProtocolError(f"bad MOVE payload of {len(payload)} bytes")
+    return MOVE_MSG.unpack(payload)
+
+def encode_leave(entity_id):
+    return frame(LEAVE, LEAVE_MSG.pack(entity_id))
+
+def decode_leave(payload):
+    if len(payload) != LEAVE_MSG.size:
+        raise ProtocolError(f"bad LEAVE payload of {len(payload)} bytes")
+    return LEAVE_MSG.unpack(payload)[0]
@@ -0,0 +1,203 @@
+# Session server: owns the map and enemy simulation and streams them to thin clients
+#
+# Run from the repository root:
+#   python -m net.server --port 8765 --size 256 --enemies 200
+#
+# Each client gets a player on the shared map. The map is sent as bit-packed chunks around
+# the client's player as it moves; every tick all clients get one frame holding only the
+# entities that moved. The first client drives the simulation's own player, which is the
+# one enemies chase; when it leaves, the longest-connected remaining client takes it over.
+import argparse
+import asyncio
+import numpy as np
+from player import Player
+from simulation import Simulation, TICK_RATE, seed_arg
+from net import protocol
+
+CHUNK_SIZE = 32
+VIEW_CHUNKS = 2  # chunks streamed on each side of the client's chunk
+# A client this far behind on reading is dropped rather than buffered without bound
+MAX_WRITE_BUFFER = 1 << 20
+
+class ClientConnection:
+    def __init__(self, client_id, player, writer):
+        self.client_id = client_id
+        self.entity_id = protocol.PLAYER_ID_BASE + client_id
+        self.player = player
+        self.writer = writer
+        self.sent_chunks = set()
+        self.bytes_sent = 0
+
+    def send(self, data):
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+
+class SessionServer:
+    def __init__(self, sim, tick_rate=TICK_RATE, chunk_size=CHUNK_SIZE, view_chunks=VIEW_CHUNKS):
+        self.sim = sim
+        self.tick_rate = tick_rate
+        self.chunk_size = chunk_size
+        self.view_chunks = view_chunks
+        self.clients = {}
+        self.next_client_id = 0
+        self.host = None  # client driving sim.player
+        self.moved_players = set()
+        self.chunk_frames = {}  # encoded CHUNK frames, shared by every client
+        if sim.terrain:
+            sim.terrain.subscribe(self.on_terrain_change)
+
+    def _chunk_frame(self, cx, cy):
+        data = self.chunk_frames.get((cx, cy))
+        if data is None:
+            cs = self.chunk_size
+            cells = self.sim.map_grid.window(cx * cs, cy * cs, cs, cs)
+            data = self.chunk_frames[(cx, cy)] = protocol.encode_chunk(cx, cy, cells)
+        return data
+
+    def on_terrain_change(self, change):
+        # Re-encode the edited chunk and push it to every client that already has it
+        key = (change.x // self.chunk_size, change.y // self.chunk_size)
+        self.chunk_frames.pop(key, None)
+        for client in self.clients.values():
+            if key in client.sent_chunks:
+                client.send(self._chunk_frame(*key))
+
+    def _send_chunks(self, client):
+        # Stream any chunk around the client's player that it doesn't have yet
+        cs = self.chunk_size
+        last = (len(self.sim.map_grid) - 1) // cs
+        pcx, pcy = client.player.x // cs, client.player.y // cs
+        for cy in range(max(0, pcy - self.view_chunks), min(last, pcy + self.view_chunks) + 1):
+            for cx in range(max(0, pcx - self.view_chunks), min(last, pcx + self.view_chunks) + 1):
+                if (cx, cy) not in client.sent_chunks:
+                    client.sent_chunks.add((cx, cy))
+                    client.send(self._chunk_frame(cx, cy))
+
+    def _snapshot(self):
+        # Every entity, for clients that just joined
+        system = self.sim.enemy_system
+        n = len(system)
+        ids = list(range(n)) + [c.entity_id for c in self.clients.values()]
+        xs = system.xs[:n].tolist() + [c.player.x for c in self.clients.values()]
+        ys = system.ys[:n].tolist() + [c.player.y for c in self.clients.values()]
+        return protocol.encode_tick(self.sim.tick, ids, xs, ys)
+
+    def move(self, client, dx, dy):
+        if abs(dx) + abs(dy) != 1:
+            raise protocol.ProtocolError(f"bad move ({dx}, {dy})")
+        if client is self.host:
+            moved = self.sim.move_player(dx, dy)
+        else:
+            old = (client.player.x, client.player.y)
+            client.player.move(dx, dy)
+            moved = (client.player.x, client.player.y) != old
+        if moved:
+            self.moved_players.add(client)
+            self._send_chunks(client)
+
+    async def handle(self, reader, writer):
+        client = None
+        try:
+            msg_type, _ = await protocol.read_frame(reader)
+            if msg_type != protocol.HELLO:
+                raise protocol.ProtocolError("expected HELLO")
+            client_id = self.next_client_id
+            self.next_client_id += 1
+            if self.host is None:
+                player = self.sim.player
+            else:
+                player = Player(self.sim.map_grid)
+            client = ClientConnection(client_id, player, writer)
+            if self.host is None:
+                self.host = client
+            self.clients[client_id] = client
+            client.send(protocol.encode_welcome(client_id, client.entity_id, len(self.sim.map_grid),
+                                                self.chunk_size, self.tick_rate))
+            self._send_chunks(client)
+            client.send(self._snapshot())
+            self.moved_players.add(client)  # let everyone else see the new player
+            while True:
+                msg_type, payload = await protocol.read_frame(reader)
+                if msg_type == protocol.MOVE:
+                    self.move(client, *protocol.decode_move(payload))
+                else:
+                    raise protocol.ProtocolError(f"unexpected message {msg_type}")
+        except (asyncio.IncompleteReadError, ConnectionError, protocol.ProtocolError):
+            pass
+        finally:
+            if client is not None:
+                self._drop(client)
+            writer.close()
+
+    def _drop(self, client):
+        # Forget a departed client: hand the simulation's player on and tell everyone else
+        if self.clients.pop(client.client_id, None) is None:
+            return
+        self.moved_players.discard(client)
+        if client is self.host:
+            self.host = next(iter(self.clients.values()), None)
+            if self.host is not None:
+                self.sim.place_player(self.host.player.x, self.host.player.y)
+                self.host.player = self.sim.player
+        data = protocol.encode_leave(client.entity_id)
+        for other in self.clients.values():
+            other.send(data)
+
+    def tick(self):
+        moved = self.sim.step()
+        system = self.sim.enemy_system
+        players = list(self.moved_players)
+        self.moved_players.clear()
+        ids = np.concatenate([moved, np.array([c.entity_id for c in players], dtype=np.int64)])
+        xs = np.concatenate([system.xs[moved], np.array([c.player.x for c in players], dtype=np.int32)])
+        ys = np.concatenate([system.ys[moved], np.array([c.player.y for c in players], dtype=np.int32)])
+        # One frame for everyone: encoded once, written to each client
+        data = protocol.encode_tick(self.sim.tick, ids, xs, ys)
+        for client in list(self.clients.values()):
+            if client.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                self._drop(client)
+                client.writer.close()
+                continue
+            client.send(data)
+
+    async def run_ticks(self):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            self.tick()
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Overloaded: skip ahead instead of bursting to catch up
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def serve(self, host, port, ready=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready.set_result(server.sockets[0].getsockname()[1])
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_ticks())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a simulated session to thin clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--seed", type=seed_arg, default=None)
+    parser.add_argument("--enemies", type=int, default=100)
+    parser.add_argument("--tick-rate", type=int, default=30)
+    args = parser.parse_args(argv)
+    sim = Simulation.create(args.size, seed=args.seed, max_enemies=args.enemies, tick_rate=args.tick_rate)
+    server = SessionServer(sim, tick_rate=args.tick_rate)
+    print(f"serving seed={sim.seed} size={args.size} enemies={len(sim.enemy_system)} on {args.host}:{args.port}",
+          flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
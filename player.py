@@ -1,10 +1,13 @@
 # Player logic
+from procedural_map.road_graph import get_road_graph
+
 class Player:
     def __init__(self, map_grid):
         self.map_grid = map_grid
         self.map_size = len(map_grid)
         self.x = self.map_size // 2
         self.y = self.map_size // 2
+        self.spatial_index = None  # SpatialHash kept up to date as the player moves
         # Find nearest road cell in center region
         if map_grid[self.y][self.x] != 0:
             found = False
@@ -23,3 +26,9 @@ class Player:
         if 0 <= nx < self.map_size and 0 <= ny < self.map_size:
             if self.map_grid[ny][nx] == 0:
                 self.x, self.y = nx, ny
+                if self.spatial_index is not None:
+                    self.spatial_index.update(self)
+    def path_to(self, x, y):
+        # Shortest road path to (x, y) over the road graph, or None
+        graph = get_road_graph(self.map_grid)
+        return graph.find_path((self.x, self.y), (x, y)) if graph else None
@@ -0,0 +1,7 @@
+# Where generated maps and other caches are kept; no other imports, so anything can use it
+import os
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PROCEDURAL_MAP_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "procedural_map"),
+)
@@ -0,0 +1,144 @@
+
+# Chunked world: fixed-size chunks generated on demand and evicted LRU
+import random
+from collections import OrderedDict
+import numpy as np
+from procedural_map.grid import ROAD, FOREST, BORDER
+from procedural_map.map_generator import generate_map
+
+CHUNK_SIZE = 64
+WORLD_CHUNKS = 4095  # Odd so the world center falls in the middle of a chunk
+MAX_CHUNKS = 64
+PORTALS_PER_EDGE = 2
+
+class _WorldRow:
+    # Row proxy so grid[y][x] callers work on the chunked world
+    def __init__(self, world, y):
+        self.world = world
+        self.y = y
+
+    def __getitem__(self, x):
+        return self.world.cell(x, self.y)
+
+class ChunkedWorld:
+    def __init__(self, seed, chunk_size=CHUNK_SIZE, world_chunks=WORLD_CHUNKS, max_chunks=MAX_CHUNKS):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.world_chunks = world_chunks
+        self.size = chunk_size * world_chunks
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return True
+
+    def __getitem__(self, y):
+        return _WorldRow(self, y)
+
+    def cell(self, x, y):
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return BORDER
+        cs = self.chunk_size
+        return self.chunk(x // cs, y // cs)[y % cs, x % cs]
+
+    def cells_at(self, xs, ys):
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        flat = [self.cell(x, y) for x, y in zip(xs.ravel().tolist(), ys.ravel().tolist())]
+        return np.array(flat, dtype=np.uint8).reshape(xs.shape)
+
+    def chunk(self, cx, cy):
+        key = (cx, cy)
+        cells = self.chunks.get(key)
+        if cells is not None:
+            self.chunks.move_to_end(key)
+            return cells
+        cells = self._generate_chunk(cx, cy)
+        self.chunks[key] = cells
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return cells
+
+    def ensure_around(self, x, y, radius=1):
+        # Generate the chunks within radius chunks of (x, y) ahead of the camera
+        cs = self.chunk_size
+        ccx, ccy = x // cs, y // cs
+        for cy in range(ccy-radius, ccy+radius+1):
+            for cx in range(ccx-radius, ccx+radius+1):
+                if 0 <= cx < self.world_chunks and 0 <= cy < self.world_chunks:
+                    self.chunk(cx, cy)
+
+    def window(self, x0, y0, w, h):
+        out = np.full((h, w), BORDER, dtype=np.uint8)
+        cs = self.chunk_size
+        for cy in range(max(y0, 0) // cs, min(y0+h, self.size) // cs + 1):
+            for cx in range(max(x0, 0) // cs, min(x0+w, self.size) // cs + 1):
+                if not (0 <= cx < self.world_chunks and 0 <= cy < self.world_chunks):
+                    continue
+                # Overlap of this chunk with the requested window, in world coords
+                ax0, ay0 = max(x0, cx*cs), max(y0, cy*cs)
+                ax1, ay1 = min(x0+w, (cx+1)*cs), min(y0+h, (cy+1)*cs)
+                if ax0 >= ax1 or ay0 >= ay1:
+                    continue
+                cells = self.chunk(cx, cy)
+                out[ay0-y0:ay1-y0, ax0-x0:ax1-x0] = cells[ay0-cy*cs:ay1-cy*cs, ax0-cx*cs:ax1-cx*cs]
+        return out
+
+    def _edge_portals(self, kind, cx, cy):
+        # Both chunks sharing an edge derive the same portal offsets from its identity
+        rng = random.Random(f"{self.seed}:{kind}:{cx}:{cy}")
+        return rng.sample(range(2, self.chunk_size-2), PORTALS_PER_EDGE)
+
+    def _generate_chunk(self, cx, cy):
+        cs = self.chunk_size
+        rng = random.Random(f"{self.seed}:{cx}:{cy}")
+        cells = generate_map(cs, rng=rng).cells
+        # Chunk edges are ordinary forest; only the world edge is a border
+        cells[cells == BORDER] = FOREST
+        last = self.world_chunks - 1
+        edges = [
+            # (is world edge, portal offsets, edge cell for offset p, inward step)
+            (cx == 0, ('v', cx-1, cy), lambda p: (0, p), (1, 0)),
+            (cx == last, ('v', cx, cy), lambda p: (cs-1, p), (-1, 0)),
+            (cy == 0, ('h', cx, cy-1), lambda p: (p, 0), (0, 1)),
+            (cy == last, ('h', cx, cy), lambda p: (p, cs-1), (0, -1)),
+        ]
+        for world_edge, portal_key, edge_cell, step in edges:
+            if world_edge:
+                continue
+            for p in self._edge_portals(*portal_key):
+                x, y = edge_cell(p)
+                self._carve_to_road(cells, x, y, step)
+        if cx == 0:
+            cells[:, 0] = BORDER
+        if cx == last:
+            cells[:, -1] = BORDER
+        if cy == 0:
+            cells[0, :] = BORDER
+        if cy == last:
+            cells[-1, :] = BORDER
+        return cells
+
+    def _carve_to_road(self, cells, x, y, step):
+        # Carve inward from the edge, then along the center line, until an existing
+        # road is reached. Every road in a chunk connects to its center, so the
+        # portal ends up connected as well.
+        center = self.chunk_size // 2
+        cells[y, x] = ROAD
+        dx, dy = step
+        while (x if dx else y) != center:
+            x, y = x+dx, y+dy
+            if cells[y, x] == ROAD:
+                return
+            cells[y, x] = ROAD
+        if dx:
+            dx, dy = 0, 1 if y < center else -1
+        else:
+            dx, dy = 1 if x < center else -1, 0
+        while (x, y) != (center, center):
+            x, y = x+dx, y+dy
+            if cells[y, x] == ROAD:
+                return
+            cells[y, x] = ROAD
@@ -0,0 +1,148 @@
+# Road connectivity: component labels of every road cell, kept current as single cells change
+from collections import deque
+
+class Connectivity:
+    # Union-find over road cells, with union by size that relabels the smaller side so every
+    # cell knows its component in O(1). A new road merges its neighbours' components; a removed
+    # one is re-checked only around itself (see _split). Cells are flat indices (y * size + x);
+    # the map edge is never road, so neighbours never wrap.
+    def __init__(self, map_grid, root=None):
+        self.size = map_grid.size
+        center = self.size // 2
+        self.root = center * self.size + center if root is None else root
+        self.label = {}    # road cell -> component label
+        self.members = {}  # component label -> set of its cells
+        self.next_label = 0
+        roads = set(map_grid.get_road_index().tolist())
+        while roads:
+            self._new_label(self._flood(roads.pop(), roads))
+
+    def _flood(self, start, roads):
+        # Cells of start's component, taken out of the roads set
+        size = self.size
+        cells = {start}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            for j in (i - 1, i + 1, i - size, i + size):
+                if j in roads:
+                    roads.discard(j)
+                    cells.add(j)
+                    queue.append(j)
+        return cells
+
+    def _neighbours(self, i):
+        label = self.label
+        return [j for j in (i - 1, i + 1, i - self.size, i + self.size) if j in label]
+
+    def _new_label(self, cells):
+        lbl = self.next_label
+        self.next_label += 1
+        self.members[lbl] = cells
+        for cell in cells:
+            self.label[cell] = lbl
+        return lbl
+
+    def connected(self, i, j=None):
+        # Whether road cells i and j (default: the root) are in one component
+        a = self.label.get(i)
+        return a is not None and a == self.label.get(self.root if j is None else j)
+
+    def add(self, i):
+        # Cell i became road; returns the cells now connected to the root that weren't before
+        root_label = self.label.get(self.root)
+        labels = {self.label[j] for j in self._neighbours(i)}
+        if i == self.root:
+            joined = [i] + [c for lbl in labels for c in self.members[lbl]]
+        elif root_label in labels:
+            joined = [i] + [c for lbl in labels if lbl != root_label for c in self.members[lbl]]
+        else:
+            joined = []
+        if not labels:
+            self._new_label({i})
+            return joined
+        keep = max(labels, key=lambda lbl: len(self.members[lbl]))
+        cells = self.members[keep]
+        for lbl in labels:
+            if lbl != keep:
+                moved = self.members.pop(lbl)
+                for cell in moved:
+                    self.label[cell] = keep
+                cells |= moved
+        cells.add(i)
+        self.label[i] = keep
+        return joined
+
+    def remove(self, i):
+        # Cell i stopped being road; returns the cells no longer connected to the root
+        root_label = self.label.get(self.root)
+        lbl = self.label.pop(i)
+        cells = self.members[lbl]
+        cells.discard(i)
+        neighbours = self._neighbours(i)
+        pieces = self._split(neighbours) if len(neighbours) > 1 else []
+        for piece in pieces:
+            cells -= piece
+            self._new_label(piece)
+        if not cells:
+            del self.members[lbl]
+        if lbl != root_label:
+            return []
+        if i == self.root:
+            return [i] + list(cells) + [c for piece in pieces for c in piece]
+        if self.label.get(self.root) == lbl:
+            return [i] + [c for piece in pieces for c in piece]
+        # The root went with a split-off piece, so the remainder and the other pieces lost it
+        root_piece = self.label[self.root]
+        return [i] + list(cells) + [c for piece in pieces if self.label[next(iter(piece))] != root_piece
+                                    for c in piece]
+
+    def _split(self, starts):
+        # Breadth-first searches from the removed cell's road neighbours, one step each in turn.
+        # Searches that meet are merged; one that runs out of cells first has enclosed a piece
+        # that is no longer attached to the rest. Stops once at most one search is still open,
+        # so the cost is bounded by the smaller sides, not the whole component. Returns the
+        # split-off pieces; whatever the last open search would have reached keeps the label.
+        k = len(starts)
+        group = list(range(k))
+
+        def find(a):
+            while group[a] != a:
+                a = group[a]
+            return a
+
+        owner = {}
+        queues = []
+        for search, start in enumerate(starts):
+            owner[start] = search
+            queues.append(deque([start]))
+        open_groups = k
+        closed = set()
+        pieces = []
+        while open_groups > 1:
+            for search in range(k):
+                queue = queues[search]
+                if not queue:
+                    continue
+                for j in self._neighbours(queue.popleft()):
+                    other = owner.get(j)
+                    if other is None:
+                        owner[j] = search
+                        queue.append(j)
+                    else:
+                        a, b = find(other), find(search)
+                        if a != b:
+                            group[a] = b
+                            open_groups -= 1
+            if open_groups < 2:
+                break
+            for g in range(k):
+                if open_groups < 2:
+                    break
+                if find(g) != g or g in closed:
+                    continue
+                if all(not queues[s] for s in range(k) if find(s) == g):
+                    closed.add(g)
+                    open_groups -= 1
+                    pieces.append({c for c, s in owner.items() if find(s) == g})
+        return pieces
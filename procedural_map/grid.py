@@ -0,0 +1,87 @@
+
+# Map grid backed by a contiguous numpy uint8 array
+import numpy as np
+
+ROAD = 0
+FOREST = 1
+BORDER = 2
+
+class MapGrid:
+    def __init__(self, cells):
+        # cells is a row-major (size, size) uint8 array indexed as cells[y, x]
+        self.cells = cells
+        self.size = cells.shape[0]
+        # Bumped on every terrain change so render caches know to rebuild
+        self.version = 0
+        self.road_graph = None  # Optional RoadGraph (see procedural_map.road_graph)
+        self.road_index = None  # Sorted int32 linear indices (y * size + x) of all road cells
+
+    @classmethod
+    def filled(cls, size, value=FOREST):
+        return cls(np.full((size, size), value, dtype=np.uint8))
+
+    # Indexing shim so existing grid[y][x] / len(grid) callers keep working
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __getitem__(self, y):
+        return self.cells[y]
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def mark_changed(self):
+        self.version += 1
+
+    def get_road_index(self):
+        # Generated maps come with the index; loaded ones build it on first use
+        if self.road_index is None:
+            self.road_index = np.flatnonzero(self.cells == ROAD).astype(np.int32)
+        return self.road_index
+
+    def fill_border(self, value=BORDER):
+        self.cells[0, :] = value
+        self.cells[-1, :] = value
+        self.cells[:, 0] = value
+        self.cells[:, -1] = value
+
+    def cells_at(self, xs, ys):
+        # Vectorized lookup of many cells; out-of-range positions read as BORDER
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        inside = (xs >= 0) & (xs < self.size) & (ys >= 0) & (ys < self.size)
+        out = np.full(xs.shape, BORDER, dtype=np.uint8)
+        out[inside] = self.cells[ys[inside], xs[inside]]
+        return out
+
+    def window(self, x0, y0, w, h):
+        # Zero-copy view of the cells in [x0, x0+w) x [y0, y0+h)
+        return self.cells[y0:y0+h, x0:x0+w]
+
+    def tolist(self):
+        return self.cells.tolist()
+
+# Cell values fit in 2 bits, so four cells share a byte (first cell in the low bits)
+CELL_BITS = 2
+CELLS_PER_BYTE = 8 // CELL_BITS
+
+def packed_size(h, w):
+    return (h * w + CELLS_PER_BYTE - 1) // CELLS_PER_BYTE
+
+def pack_cells(cells):
+    flat = np.ascontiguousarray(cells, dtype=np.uint8).ravel()
+    padded = np.zeros(packed_size(1, flat.size) * CELLS_PER_BYTE, dtype=np.uint8)
+    padded[:flat.size] = flat
+    quads = padded.reshape(-1, CELLS_PER_BYTE)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+def unpack_cells(buffer, h, w, offset=0):
+    # Decodes straight from any bytes-like object (bytes, memoryview, mmap) without copying it first
+    packed = np.frombuffer(buffer, dtype=np.uint8, count=packed_size(h, w), offset=offset)
+    quads = np.empty((packed.size, CELLS_PER_BYTE), dtype=np.uint8)
+    for i in range(CELLS_PER_BYTE):
+        np.right_shift(packed, i * CELL_BITS, out=quads[:, i])
+    quads &= 3
+    return quads.ravel()[:h * w].reshape(h, w)
@@ -0,0 +1,56 @@
+
+# On-disk map cache: grids stored as .npy files and loaded memory-mapped
+import hashlib
+import os
+import tempfile
+import numpy as np
+from procedural_map.cache_dir import DEFAULT_CACHE_DIR
+from procedural_map.grid import MapGrid
+from procedural_map.map_generator import generate_map, GENERATOR_VERSION
+
+def cache_key(seed, size, version=GENERATOR_VERSION):
+    # Content address of a generated map: same version, seed and size -> same grid
+    return hashlib.sha256(f"{version}:{seed}:{size}".encode()).hexdigest()
+
+class MapCache:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+
+    def path_for(self, seed, size):
+        return os.path.join(self.cache_dir, cache_key(seed, size) + ".npy")
+
+    def load(self, seed, size):
+        path = self.path_for(seed, size)
+        try:
+            # Read-only memory map: no parsing, pages shared between processes
+            cells = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if cells.shape != (size, size) or cells.dtype != np.uint8:
+            return None
+        return MapGrid(cells)
+
+    def store(self, grid, seed, size):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(seed, size)
+        # Write to a temp file and rename so readers never see a partial map
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, np.ascontiguousarray(grid.cells))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+    def get_or_generate(self, size, seed, progress=None):
+        grid = self.load(seed, size)
+        if grid is None:
+            grid = generate_map(size, seed=seed, progress=progress)
+            try:
+                self.store(grid, seed, size)
+            except OSError:
+                # A read-only or full cache dir should not stop the game
+                return grid
+        return grid
@@ -1,9 +1,11 @@
 
 import random
+import numpy as np
+from procedural_map.grid import MapGrid, ROAD, FOREST, BORDER
+from procedural_map.road_graph import RoadGraph
 
-ROAD = 0
-FOREST = 1
-BORDER = 2
+# Bump whenever a change alters the maps produced for a given seed (invalidates cached maps)
+GENERATOR_VERSION = 2
 
 DIRECTIONS = [(-1,0), (1,0), (0,-1), (0,1)]
 PERPENDICULAR = {
@@ -19,13 +21,106 @@ def in_bounds(x, y, size):
 def is_road(grid, x, y, size):
     return in_bounds(x, y, size) and grid[y][x] == ROAD
 
-def generate_map(size=128):
-    grid = [[FOREST for _ in range(size)] for _ in range(size)]
-    for i in range(size):
-        grid[0][i] = BORDER
-        grid[size-1][i] = BORDER
-        grid[i][0] = BORDER
-        grid[i][size-1] = BORDER
+# Flat-index counterparts of DIRECTIONS / PERPENDICULAR (direction i -> offset i for a given size)
+def direction_offsets(size):
+    return [dy * size + dx for dx, dy in DIRECTIONS]
+
+PERPENDICULAR_INDEX = [[DIRECTIONS.index(p) for p in PERPENDICULAR[d]] for d in DIRECTIONS]
+
+# Working cell byte during generation: the final cell value plus bookkeeping bits, so the
+# whole working state is one byte per cell (the grid itself) instead of one array per flag
+TERRAIN = 0b11          # ROAD, FOREST or BORDER
+PROTECTED = 0b100       # central region, never overwritten
+NEIGHBOUR = 0b1000      # road neighbour count in bits 3-5 (at most 4)
+VISITED = 0b1000000     # reached by the connectivity flood
+# Unvisited road iff (cell & OPEN_MASK) == ROAD
+OPEN_MASK = TERRAIN | VISITED
+MARK_VISITED = bytes(c | VISITED for c in range(256))
+# Final cell values: bookkeeping bits dropped, roads the flood missed turned back into forest
+CLEANUP = bytes(FOREST if c & TERRAIN == ROAD and not c & VISITED else c & TERRAIN for c in range(256))
+# Cleanup block size in bytes (whole rows); bounds its temporaries whatever the map size
+CLEANUP_BLOCK_BYTES = 1 << 20
+
+def _scanline_flood(grid, size, start, total=0, progress=None):
+    # Mark the road cells connected to start with VISITED, one horizontal span at a time; the
+    # outer ring must hold no roads. Returns the number of cells marked. progress, if given,
+    # is called with the marked fraction of total.
+    if grid[start] & OPEN_MASK != ROAD:
+        return 0
+    stack = [start]
+    pop, push = stack.pop, stack.append
+    count = 0
+    report_every = max(1, total // 100)
+    next_report = report_every
+    while stack:
+        i = pop()
+        if grid[i] & OPEN_MASK != ROAD:
+            continue
+        lo = hi = i
+        while grid[lo - 1] & OPEN_MASK == ROAD:
+            lo -= 1
+        while grid[hi + 1] & OPEN_MASK == ROAD:
+            hi += 1
+        if lo == hi:
+            # Most spans are a single cell of a vertical road
+            grid[i] |= VISITED
+            count += 1
+            if grid[i - size] & OPEN_MASK == ROAD:
+                push(i - size)
+            if grid[i + size] & OPEN_MASK == ROAD:
+                push(i + size)
+        else:
+            grid[lo:hi + 1] = grid[lo:hi + 1].translate(MARK_VISITED)
+            count += hi - lo + 1
+            # One seed per run of open cells directly above and below the span
+            for j in (lo - size, lo + size):
+                end = j + hi - lo
+                while j <= end:
+                    if grid[j] & OPEN_MASK == ROAD:
+                        push(j)
+                        while j <= end and grid[j] & OPEN_MASK == ROAD:
+                            j += 1
+                    j += 1
+        if progress is not None and count >= next_report:
+            progress(count / total)
+            next_report += report_every
+    return count
+
+def flood(cells, x, y):
+    # Mask of the road cells connected to (x, y). Edge cells are out of bounds, as in in_bounds.
+    size = cells.shape[0]
+    flat = bytearray(size * size)
+    grid = np.frombuffer(flat, dtype=np.uint8).reshape(size, size)
+    grid[:] = cells
+    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = BORDER
+    _scanline_flood(flat, size, y * size + x)
+    return (grid & VISITED) != 0
+
+def generate_map(size=128, seed=None, rng=None, with_graph=False, progress=None):
+    # A seed gives fully deterministic output; rng lets callers share their own random.Random.
+    # progress, if given, is called with the completed fraction (0.0-1.0) as generation runs.
+    if rng is None:
+        rng = random.Random(seed) if seed is not None else random
+    # Flat row-major working state, one byte per cell (see TERRAIN and the bits after it).
+    # The outer ring is BORDER, so any interior cell's neighbours are in range.
+    n = size * size
+    grid = bytearray([FOREST]) * n
+    grid[0:size] = grid[n-size:n] = bytes([BORDER]) * size
+    grid[0::size] = grid[size-1::size] = bytes([BORDER]) * size
+    offsets = direction_offsets(size)
+    left, right, up, down = offsets
+    roads = 0
+
+    def set_road(i):
+        nonlocal roads
+        cell = grid[i]
+        if cell & TERRAIN != ROAD:
+            grid[i] = cell & ~TERRAIN
+            grid[i+left] += NEIGHBOUR
+            grid[i+right] += NEIGHBOUR
+            grid[i+up] += NEIGHBOUR
+            grid[i+down] += NEIGHBOUR
+            roads += 1
 
     center = size // 2
 
@@ -37,155 +132,131 @@ def generate_map(size=128):
     inner_start = center - central_size_inner // 2
     inner_end = center + central_size_inner // 2
 
-    # Track central region cells so they are never overwritten
-    central_cells = set()
-    # Outer square
+    # Central region cells are protected so they are never overwritten
+    central = []
     for i in range(outer_start, outer_end+1):
-        grid[outer_start][i] = ROAD
-        grid[outer_end][i] = ROAD
-        grid[i][outer_start] = ROAD
-        grid[i][outer_end] = ROAD
-        central_cells.add((outer_start, i))
-        central_cells.add((outer_end, i))
-        central_cells.add((i, outer_start))
-        central_cells.add((i, outer_end))
-    # Inner square
+        # Outer square
+        central += [(i, outer_start), (i, outer_end), (outer_start, i), (outer_end, i)]
+        # Central cross
+        central += [(i, center), (center, i)]
     for i in range(inner_start, inner_end+1):
-        grid[inner_start][i] = ROAD
-        grid[inner_end][i] = ROAD
-        grid[i][inner_start] = ROAD
-        grid[i][inner_end] = ROAD
-        central_cells.add((inner_start, i))
-        central_cells.add((inner_end, i))
-        central_cells.add((i, inner_start))
-        central_cells.add((i, inner_end))
-    # Central cross
-    for i in range(outer_start, outer_end+1):
-        grid[center][i] = ROAD
-        grid[i][center] = ROAD
-        central_cells.add((center, i))
-        central_cells.add((i, center))
+        # Inner square
+        central += [(i, inner_start), (i, inner_end), (inner_start, i), (inner_end, i)]
+    for x, y in central:
+        set_road(y * size + x)
+        grid[y * size + x] |= PROTECTED
 
-    # Start branches from the edges of the outer square and cross
+    # Start branches from the edges of the outer square and cross: (flat position, direction index)
+    LEFT, RIGHT, UP, DOWN = range(4)
     branches = []
     # Top and bottom edges
     for i in range(outer_start+1, outer_end):
-        branches.append({'x': i, 'y': outer_start, 'dir': (0,-1), 'length': 0, 'parent': None})
-        branches.append({'x': i, 'y': outer_end, 'dir': (0,1), 'length': 0, 'parent': None})
+        branches.append((outer_start * size + i, UP))
+        branches.append((outer_end * size + i, DOWN))
     # Left and right edges
     for i in range(outer_start+1, outer_end):
-        branches.append({'x': outer_start, 'y': i, 'dir': (-1,0), 'length': 0, 'parent': None})
-        branches.append({'x': outer_end, 'y': i, 'dir': (1,0), 'length': 0, 'parent': None})
+        branches.append((i * size + outer_start, LEFT))
+        branches.append((i * size + outer_end, RIGHT))
     # Cross ends
-    branches.append({'x': center, 'y': outer_start, 'dir': (0,-1), 'length': 0, 'parent': None})
-    branches.append({'x': center, 'y': outer_end, 'dir': (0,1), 'length': 0, 'parent': None})
-    branches.append({'x': outer_start, 'y': center, 'dir': (-1,0), 'length': 0, 'parent': None})
-    branches.append({'x': outer_end, 'y': center, 'dir': (1,0), 'length': 0, 'parent': None})
+    branches.append((outer_start * size + center, UP))
+    branches.append((outer_end * size + center, DOWN))
+    branches.append((center * size + outer_start, LEFT))
+    branches.append((center * size + outer_end, RIGHT))
 
     max_roads = size * 6  # More roads for larger map
     road_count = 0
     junctions = set()
     min_road_len = max(size // 4, size // 3)  # Much larger minimum road segment length for full coverage
+    half_min_len = min_road_len // 2
+    turn_chance = 0.2
+    junction_chance = 0.15
+    random_ = rng.random
+    # Growth is most of the work; report it in ~1% steps of the road budget
+    report_every = max(1, max_roads // 100)
+    next_report = report_every
 
     while branches and road_count < max_roads:
-        branch = branches.pop(random.randint(0, len(branches)-1))
-        x, y = branch['x'], branch['y']
-        dir = branch['dir']
+        # O(1) swap-remove of a random branch
+        k = rng.randrange(len(branches))
+        pos, d = branches[k]
+        last = branches.pop()
+        if k < len(branches):
+            branches[k] = last
+        y, x = divmod(pos, size)
         length = 0
         # Guarantee some branches reach the border as part of procedural generation
-        if random.random() < 0.25 or (len(branches) < 8 and length == 0):
+        if random_() < 0.25 or len(branches) < 8:
             # Calculate distance to border in direction
-            if dir[0] != 0:
-                max_len = (size-2-x) if dir[0] > 0 else (x-1)
-            else:
-                max_len = (size-2-y) if dir[1] > 0 else (y-1)
+            max_len = {LEFT: x-1, RIGHT: size-2-x, UP: y-1, DOWN: size-2-y}[d]
             max_len = max(min_road_len, max_len)
         else:
-            max_len = random.randint(min_road_len, size//2)
-        turn_chance = 0.2
-        junction_chance = 0.15
-        loop_chance = 0.08
+            max_len = rng.randint(min_road_len, size//2)
         while length < max_len:
             # Organic turn
-            if random.random() < turn_chance:
-                perp_dirs = PERPENDICULAR[dir]
-                dir = random.choice(perp_dirs)
-            nx, ny = x+dir[0], y+dir[1]
-            if not in_bounds(nx, ny, size):
-                break
-            # Never overwrite central region
-            if (nx, ny) in central_cells:
+            if random_() < turn_chance:
+                d = rng.choice(PERPENDICULAR_INDEX[d])
+            npos = pos + offsets[d]
+            cell = grid[npos]
+            # Stepping onto the border means leaving the map; never overwrite central region
+            if cell & TERRAIN == BORDER or cell & PROTECTED:
                 break
-            # Ensure minimum distance between roads (except at junctions)
-            adjacent_road = False
-            for ddx, ddy in DIRECTIONS:
-                ax, ay = nx+ddx, ny+ddy
-                if (ax, ay) != (x, y) and in_bounds(ax, ay, size) and grid[ay][ax] == ROAD:
-                    adjacent_road = True
-            # Only allow perpendicular connections, never diagonals
-            # (No diagonal checks, so this is already enforced)
-            if adjacent_road:
+            # Ensure minimum distance between roads (except at junctions): the current cell is
+            # always a road, so any second road neighbour means another road is adjacent
+            if cell >= 2 * NEIGHBOUR:
                 # Allow if connecting at a junction or dead end
-                if length > min_road_len//2 and random.random() < 0.3:
-                    grid[ny][nx] = ROAD
-                    break
-                else:
-                    break
+                if length > half_min_len and random_() < 0.3:
+                    set_road(npos)
+                break
             # Avoid immediate connection to other roads
-            if grid[ny][nx] == ROAD:
-                # Loop formation
-                if random.random() < loop_chance and length > min_road_len//2:
-                    break
-                else:
-                    break
-            grid[ny][nx] = ROAD
-            x, y = nx, ny
+            if cell & TERRAIN == ROAD:
+                break
+            set_road(npos)
+            pos = npos
             length += 1
             road_count += 1
+            if progress is not None and road_count >= next_report:
+                progress(0.9 * road_count / max_roads)
+                next_report += report_every
             # Branching
-            if length > min_road_len//2 and random.random() < junction_chance:
-                if (x, y) not in junctions:
-                    junctions.add((x, y))
-                    num_branches = random.randint(1,3)
-                    perp_dirs = PERPENDICULAR[dir]
-                    for _ in range(num_branches):
-                        bdir = random.choice(perp_dirs)
-                        bx, by = x+bdir[0], y+bdir[1]
-                        # Ensure new branch doesn't start next to a road (perpendicular only)
-                        branch_adjacent_road = False
-                        for ddx, ddy in DIRECTIONS:
-                            ax, ay = bx+ddx, by+ddy
-                            if (ax, ay) != (x, y) and in_bounds(ax, ay, size) and grid[ay][ax] == ROAD:
-                                branch_adjacent_road = True
-                        # Never start a branch in the central region
-                        if in_bounds(bx, by, size) and grid[by][bx] != ROAD and not branch_adjacent_road and (bx, by) not in central_cells:
-                            branches.append({
-                                'x': x,
-                                'y': y,
-                                'dir': bdir,
-                                'length': 0,
-                                'parent': (x, y)
-                            })
-            # Dead end
-            if length == max_len and random.random() < 0.5:
-                break
-    # Ensure connectivity: simple flood fill from center
-    visited = set()
-    def flood(x, y):
-        stack = [(x, y)]
-        while stack:
-            cx, cy = stack.pop()
-            visited.add((cx, cy))
-            for dx, dy in DIRECTIONS:
-                nx, ny = cx+dx, cy+dy
-                if in_bounds(nx, ny, size) and grid[ny][nx] == ROAD and (nx, ny) not in visited:
-                    stack.append((nx, ny))
-    flood(center, center)
-    # Remove isolated roads
-    for y in range(size):
-        for x in range(size):
-            if grid[y][x] == ROAD and (x, y) not in visited:
-                grid[y][x] = FOREST
+            if length > half_min_len and random_() < junction_chance and pos not in junctions:
+                junctions.add(pos)
+                perp_dirs = PERPENDICULAR_INDEX[d]
+                for _ in range(rng.randint(1, 3)):
+                    bdir = rng.choice(perp_dirs)
+                    b = pos + offsets[bdir]
+                    # Start only on plain forest (not border, road or central region) that has
+                    # no road neighbour besides the junction itself
+                    if grid[b] & (TERRAIN | PROTECTED) == FOREST and grid[b] < 2 * NEIGHBOUR:
+                        branches.append((pos, bdir))
+    if progress is not None:
+        progress(0.9)
+    # Ensure connectivity: flood fill from center, then turn isolated roads back into forest
+    flood_progress = None
+    if progress is not None:
+        def flood_progress(fraction):
+            progress(0.9 + 0.05 * fraction)
+    connected = _scanline_flood(grid, size, center * size + center, roads, flood_progress)
+    # Cleanup streams over blocks of rows so no full-size temporary is ever allocated. After it
+    # the roads are exactly the flooded cells, so the road index is collected on the way.
+    road_index = np.empty(connected, dtype=np.int32)
+    found = 0
+    block = max(1, CLEANUP_BLOCK_BYTES // size) * size
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        grid[start:end] = grid[start:end].translate(CLEANUP)
+        rows = np.frombuffer(grid, dtype=np.uint8, count=end - start, offset=start)
+        hits = np.flatnonzero(rows == ROAD)
+        road_index[found:found + len(hits)] = hits + start
+        found += len(hits)
+        if progress is not None:
+            progress(0.95 + 0.05 * end / n)
+    grid = MapGrid(np.frombuffer(grid, dtype=np.uint8).reshape(size, size))
+    grid.road_index = road_index
+    if with_graph:
+        # Compressed road graph for hierarchical path queries
+        grid.road_graph = RoadGraph.from_grid(grid)
+    if progress is not None:
+        progress(1.0)
     return grid
 
 # For testing
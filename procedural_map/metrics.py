@@ -0,0 +1,57 @@
+
+# Vectorized quality metrics for generated maps
+import numpy as np
+from procedural_map.grid import ROAD
+from procedural_map.map_generator import flood
+
+def road_neighbour_counts(road):
+    # Number of 4-connected road neighbours of every cell
+    counts = np.zeros(road.shape, dtype=np.int8)
+    counts[1:, :] += road[:-1, :]
+    counts[:-1, :] += road[1:, :]
+    counts[:, 1:] += road[:, :-1]
+    counts[:, :-1] += road[:, 1:]
+    return counts
+
+def straight_run_lengths(road):
+    # Lengths of the maximal horizontal and vertical road runs of two or more cells
+    lengths = []
+    for mask in (road, road.T):
+        padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask
+        edges = np.diff(padded, axis=1)
+        # Starts and ends come out in the same row-major order, so they pair up
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        lengths.append(ends - starts)
+    lengths = np.concatenate(lengths)
+    return lengths[lengths >= 2]
+
+def corridor_histogram(lengths, size):
+    # Counts per power-of-two length bucket: [2, 4), [4, 8), ...
+    edges = [2]
+    while edges[-1] <= size:
+        edges.append(edges[-1] * 2)
+    counts, _ = np.histogram(lengths, bins=edges)
+    return {f"{lo}-{hi-1}": int(c) for lo, hi, c in zip(edges[:-1], edges[1:], counts)}
+
+def map_metrics(cells):
+    size = cells.shape[0]
+    road = cells == ROAD
+    road_count = int(road.sum())
+    neighbours = road_neighbour_counts(road)
+    center = size // 2
+    reachable = int(flood(cells, center, center).sum()) if road[center, center] else 0
+    # Roads on the ring just inside the border, and which sides they reach
+    sides = [road[1, 1:-1], road[-2, 1:-1], road[1:-1, 1], road[1:-1, -2]]
+    border_cells = int(road[1, 1:-1].sum() + road[-2, 1:-1].sum() + road[2:-2, 1].sum() + road[2:-2, -2].sum())
+    return {
+        'road_cells': road_count,
+        'road_coverage': road_count / float((size - 2) ** 2),
+        'dead_ends': int((road & (neighbours == 1)).sum()),
+        'junctions': int((road & (neighbours >= 3)).sum()),
+        'corridor_histogram': corridor_histogram(straight_run_lengths(road), size),
+        'reachable_fraction': reachable / road_count if road_count else 0.0,
+        'border_cells': border_cells,
+        'border_sides_reached': int(sum(bool(side.any()) for side in sides)),
+    }
@@ -0,0 +1,200 @@
+
+# Road graph: junctions, dead ends and the center as nodes, corridors between them as edges
+import heapq
+import numpy as np
+from procedural_map.grid import ROAD
+
+START = -1
+GOAL = -2
+
+def get_road_graph(grid):
+    # Road graph of a MapGrid, built on first use and kept on the grid; None for other grids
+    if not hasattr(grid, 'road_graph'):
+        return None
+    if grid.road_graph is None:
+        grid.road_graph = RoadGraph.from_grid(grid)
+    return grid.road_graph
+
+class RoadGraph:
+    def __init__(self, size):
+        self.size = size
+        self.adjacency = {}   # node cell index -> [(neighbour node, length, edge id)]
+        self.edges = []       # edge id -> (node a, node b, interior cell indices from a to b)
+        self.cell_edge = {}   # corridor cell index -> (edge id, offset from node a)
+
+    @classmethod
+    def from_grid(cls, grid):
+        size = grid.size
+        road = grid.cells == ROAD
+        counts = np.zeros(road.shape, dtype=np.int8)
+        counts[1:, :] += road[:-1, :]
+        counts[:-1, :] += road[1:, :]
+        counts[:, 1:] += road[:, :-1]
+        counts[:, :-1] += road[:, 1:]
+        # Every road cell that is not a plain corridor cell becomes a node, plus the center
+        node_mask = road & (counts != 2)
+        center = size // 2
+        node_mask[center, center] = road[center, center]
+        graph = cls(size)
+        road_flat = road.ravel().tobytes()
+        node_flat = bytearray(node_mask.ravel().tobytes())
+        for node in np.flatnonzero(node_mask).tolist():
+            graph.adjacency[node] = []
+        graph._walk_corridors(road_flat, node_flat, list(graph.adjacency))
+        # Loops made only of corridor cells have no node yet: promote one cell and walk them too
+        road_idx = np.flatnonzero(road).tolist()
+        for cell in road_idx:
+            if not node_flat[cell] and cell not in graph.cell_edge:
+                node_flat[cell] = 1
+                graph.adjacency[cell] = []
+                graph._walk_corridors(road_flat, node_flat, [cell])
+        return graph
+
+    def _walk_corridors(self, road, is_node, nodes):
+        size = self.size
+        offsets = (1, -1, size, -size)
+        seen_direct = set()
+        for a in nodes:
+            for off in offsets:
+                cell = a + off
+                if not road[cell] or cell in self.cell_edge:
+                    continue
+                if is_node[cell]:
+                    # Adjacent nodes: a corridor of length 1 with no interior cells
+                    pair = (min(a, cell), max(a, cell))
+                    if pair not in seen_direct:
+                        seen_direct.add(pair)
+                        self._add_edge(a, cell, [])
+                    continue
+                interior = []
+                prev = a
+                while not is_node[cell]:
+                    interior.append(cell)
+                    for step in offsets:
+                        nxt = cell + step
+                        if nxt != prev and road[nxt]:
+                            break
+                    prev, cell = cell, nxt
+                self._add_edge(a, cell, interior)
+
+    def _add_edge(self, a, b, interior):
+        edge_id = len(self.edges)
+        self.edges.append((a, b, interior))
+        length = len(interior) + 1
+        self.adjacency[a].append((b, length, edge_id))
+        self.adjacency[b].append((a, length, edge_id))
+        for offset, cell in enumerate(interior, 1):
+            self.cell_edge[cell] = (edge_id, offset)
+
+    @property
+    def node_count(self):
+        return len(self.adjacency)
+
+    def _attach(self, cell, virtual, links):
+        # Connect a query endpoint to the graph: itself if it is a node, else both ends of its corridor
+        if cell in self.adjacency:
+            links.setdefault(virtual, []).append((cell, 0, None))
+            return True
+        entry = self.cell_edge.get(cell)
+        if entry is None:
+            return False
+        edge_id, offset = entry
+        a, b, interior = self.edges[edge_id]
+        links.setdefault(virtual, []).append((a, offset, (edge_id, 'to_a')))
+        links[virtual].append((b, len(interior) + 1 - offset, (edge_id, 'to_b')))
+        return True
+
+    def find_path(self, start, goal):
+        # A* over the compressed graph; returns the full list of (x, y) cells or None
+        size = self.size
+        s, g = start[1] * size + start[0], goal[1] * size + goal[0]
+        if s == g:
+            return [start]
+        links = {}
+        if not self._attach(s, START, links) or not self._attach(g, GOAL, links):
+            return None
+        # Goal links, reversed so nodes know how far they are from the goal
+        goal_links = {}
+        for node, length, via in links[GOAL]:
+            goal_links.setdefault(node, []).append((length, via))
+        gx, gy = goal
+
+        def h(node):
+            return abs(node % size - gx) + abs(node // size - gy)
+
+        best = {START: 0}
+        came_from = {}
+        heap = [(0, START)]
+        # Both endpoints on the same corridor: the direct walk along it is a candidate too
+        se, ge = self.cell_edge.get(s), self.cell_edge.get(g)
+        if se and ge and se[0] == ge[0]:
+            best[GOAL] = abs(se[1] - ge[1])
+            came_from[GOAL] = (START, 'direct')
+            heapq.heappush(heap, (best[GOAL], GOAL))
+        while heap:
+            f, node = heapq.heappop(heap)
+            if node == GOAL:
+                break
+            cost = best[node]
+            if f > cost + (h(node) if node >= 0 else 0):
+                continue
+            neighbours = links[START] if node == START else [
+                (nb, length, ('edge', edge_id)) for nb, length, edge_id in self.adjacency[node]]
+            for nb, length, via in neighbours:
+                new_cost = cost + length
+                if new_cost < best.get(nb, float('inf')):
+                    best[nb] = new_cost
+                    came_from[nb] = (node, via)
+                    heapq.heappush(heap, (new_cost + h(nb), nb))
+            for length, via in goal_links.get(node, ()):
+                new_cost = cost + length
+                if new_cost < best.get(GOAL, float('inf')):
+                    best[GOAL] = new_cost
+                    came_from[GOAL] = (node, via)
+                    heapq.heappush(heap, (new_cost, GOAL))
+        if GOAL not in came_from:
+            return None
+        return self._expand(came_from, s, g)
+
+    def _expand(self, came_from, s, g):
+        # Turn the node-level route back into cells
+        hops = []
+        node = GOAL
+        while node != START:
+            prev, via = came_from[node]
+            hops.append((prev, node, via))
+            node = prev
+        hops.reverse()
+        cells = [s]
+        for prev, node, via in hops:
+            if via == 'direct':
+                se, ge = self.cell_edge[s], self.cell_edge[g]
+                interior = self.edges[se[0]][2]
+                step = 1 if ge[1] > se[1] else -1
+                cells.extend(interior[i - 1] for i in range(se[1] + step, ge[1] + step, step))
+                continue
+            if via is None:
+                # Endpoint that is itself a node
+                continue
+            if via[0] == 'edge':
+                a, b, interior = self.edges[via[1]]
+                cells.extend(interior if prev == a else interior[::-1])
+                cells.append(node)
+                continue
+            edge_id, direction = via
+            a, b, interior = self.edges[edge_id]
+            here = s if prev == START else g
+            offset = self.cell_edge[here][1]
+            if prev == START:
+                # Leave the start corridor toward one of its ends
+                part = interior[:offset - 1][::-1] if direction == 'to_a' else interior[offset:]
+                cells.extend(part)
+                cells.append(node)
+            else:
+                # Enter the goal corridor from one of its ends
+                part = interior[:offset] if direction == 'to_a' else interior[offset - 1:][::-1]
+                cells.extend(part)
+        size = self.size
+        path = [(c % size, c // size) for c in cells]
+        # Drop repeats where a node endpoint was appended twice
+        return [p for i, p in enumerate(path) if i == 0 or p != path[i - 1]]
@@ -0,0 +1,86 @@
+# Runtime terrain edits: dig or block single cells of a MapGrid and notify whoever caches terrain
+import numpy as np
+from procedural_map.grid import ROAD, FOREST
+from procedural_map.connectivity import Connectivity
+
+class TerrainChange:
+    # One edited cell, passed to every listener after the grid has been updated
+    def __init__(self, map_grid, x, y, old, new, connected, disconnected):
+        self.map_grid = map_grid
+        self.x = x
+        self.y = y
+        self.index = y * map_grid.size + x
+        self.old = old
+        self.new = new
+        self.version = map_grid.version  # grid version after the edit
+        # Flat indices of road cells that gained / lost a connection to the map center
+        self.connected = connected
+        self.disconnected = disconnected
+
+class TerrainEditor:
+    def __init__(self, map_grid):
+        self.map_grid = map_grid
+        self.listeners = []
+        self.connectivity = None  # built on the first edit
+
+    def subscribe(self, listener):
+        # listener(change) runs after every edit, in subscription order
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def get_connectivity(self):
+        if self.connectivity is None:
+            self.connectivity = Connectivity(self.map_grid)
+        return self.connectivity
+
+    def connected(self, x, y):
+        # Whether (x, y) is a road linked to the map center
+        return self.get_connectivity().connected(y * self.map_grid.size + x)
+
+    def dig(self, x, y):
+        return self.set_cell(x, y, ROAD)
+
+    def block(self, x, y):
+        return self.set_cell(x, y, FOREST)
+
+    def set_cell(self, x, y, value):
+        # Returns the TerrainChange, or None if nothing changed. The border ring can't be edited.
+        if value not in (ROAD, FOREST):
+            raise ValueError(f"cells can only be dug or blocked, not set to {value}")
+        grid = self.map_grid
+        if not (1 <= x < grid.size - 1 and 1 <= y < grid.size - 1):
+            return None
+        old = int(grid.cells[y, x])
+        if old == value:
+            return None
+        connectivity = self.get_connectivity()
+        if not grid.cells.flags.writeable:
+            # Cached maps are read-only memory maps; edits go to a private copy
+            grid.cells = np.array(grid.cells)
+        grid.cells[y, x] = value
+        i = y * grid.size + x
+        if value == ROAD:
+            connected, disconnected = connectivity.add(i), []
+        else:
+            connected, disconnected = [], connectivity.remove(i)
+        self._update_road_index(i, value == ROAD)
+        # Corridors changed shape; get_road_graph rebuilds the graph on the next path query
+        grid.road_graph = None
+        grid.mark_changed()
+        change = TerrainChange(grid, x, y, old, value, connected, disconnected)
+        for listener in list(self.listeners):
+            listener(change)
+        return change
+
+    def _update_road_index(self, i, road):
+        # Keep the sorted spawn index in step without rescanning the grid
+        index = self.map_grid.road_index
+        if index is None:
+            return
+        pos = int(np.searchsorted(index, i))
+        if road:
+            self.map_grid.road_index = np.insert(index, pos, i).astype(np.int32, copy=False)
+        elif pos < len(index) and index[pos] == i:
+            self.map_grid.road_index = np.delete(index, pos)
@@ -0,0 +1,138 @@
+# Frame profiler: named timing spans kept in a fixed-size ring buffer
+#
+# Spans cost one attribute check when the profiler is disabled:
+#   with PROFILER.span("draw_gameplay"):
+#       ...
+import json
+import time
+from array import array
+import numpy as np
+
+DEFAULT_CAPACITY = 1 << 16
+FRAME_SPAN = "frame"
+
+class _NullSpan:
+    # Shared do-nothing span handed out while profiling is off
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('profiler', 'name_id', 'start')
+
+    def __init__(self, profiler, name_id):
+        self.profiler = profiler
+        self.name_id = name_id
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name_id, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+class Profiler:
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.names = []      # span name by id
+        self.name_ids = {}   # span name -> id
+        # Parallel ring buffers; slot = count % capacity, oldest entries are overwritten
+        self.ids = array('i', [0]) * capacity
+        self.starts = array('q', [0]) * capacity
+        self.durations = array('q', [0]) * capacity
+        self.count = 0
+        self.origin = time.perf_counter_ns()
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return _Span(self, name_id)
+
+    def record(self, name_id, start, duration):
+        slot = self.count % self.capacity
+        self.ids[slot] = name_id
+        self.starts[slot] = start
+        self.durations[slot] = duration
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def _recent(self):
+        # (ids, starts, durations) of the buffered spans, oldest first
+        n = min(self.count, self.capacity)
+        order = (np.arange(self.count - n, self.count) % self.capacity)
+        ids = np.frombuffer(self.ids, dtype=np.int32)[order]
+        starts = np.frombuffer(self.starts, dtype=np.int64)[order]
+        durations = np.frombuffer(self.durations, dtype=np.int64)[order]
+        return ids, starts, durations
+
+    def durations_ms(self, name):
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            return np.zeros(0)
+        ids, _, durations = self._recent()
+        return durations[ids == name_id] / 1e6
+
+    def frame_percentiles(self, percentiles=(50, 90, 99)):
+        # Frame-time percentiles in ms over the buffered frames; empty until a frame is recorded
+        frames = self.durations_ms(FRAME_SPAN)
+        if not len(frames):
+            return {}
+        values = np.percentile(frames, percentiles)
+        stats = {f"p{p}": float(v) for p, v in zip(percentiles, values)}
+        stats['max'] = float(frames.max())
+        return stats
+
+    def span_stats(self):
+        # name -> (count, mean ms, max ms) over the buffered spans
+        ids, _, durations = self._recent()
+        stats = {}
+        for name_id, name in enumerate(self.names):
+            d = durations[ids == name_id]
+            if len(d):
+                stats[name] = (len(d), float(d.mean()) / 1e6, float(d.max()) / 1e6)
+        return stats
+
+    def spans(self):
+        # Buffered spans as (name, start ms since the profiler was created, duration ms)
+        ids, starts, durations = self._recent()
+        return [(self.names[i], (s - self.origin) / 1e6, d / 1e6)
+                for i, s, d in zip(ids.tolist(), starts.tolist(), durations.tolist())]
+
+    def dump_json(self, path):
+        data = {
+            'frame_percentiles_ms': self.frame_percentiles(),
+            'span_stats': {name: {'count': c, 'mean_ms': m, 'max_ms': mx}
+                           for name, (c, m, mx) in self.span_stats().items()},
+            'spans': [{'name': n, 'start_ms': s, 'duration_ms': d} for n, s, d in self.spans()],
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    def dump_chrome_trace(self, path):
+        # Trace Event Format: open in chrome://tracing or https://ui.perfetto.dev
+        events = [{'name': n, 'ph': 'X', 'ts': s * 1000.0, 'dur': d * 1000.0, 'pid': 0, 'tid': 0}
+                  for n, s, d in self.spans()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def dump(self, path):
+        # Chrome trace for *.trace.json, plain JSON otherwise
+        if path.endswith(".trace.json"):
+            self.dump_chrome_trace(path)
+        else:
+            self.dump_json(path)
+
+# Process-wide profiler used by the game loop and drawing code
+PROFILER = Profiler()
@@ -0,0 +1,124 @@
+# Session recording and deterministic replay
+#
+# A recording holds the session settings and seed, the player's inputs by tick and periodic
+# state checksums. Replaying rebuilds the session from the seed, feeds the inputs back on
+# the same ticks as fast as possible and checks every checksum:
+#   python replay.py session.json
+import argparse
+import json
+import sys
+import time
+import zlib
+import numpy as np
+from simulation import Simulation
+
+FORMAT_VERSION = 2  # 2: checksums cover scheduled move ticks instead of float timers
+CHECKSUM_INTERVAL = 60  # ticks between state checksums
+
+class ReplayMismatch(Exception):
+    def __init__(self, tick, expected, actual):
+        super().__init__(f"state diverged at tick {tick}: expected {expected:08x}, got {actual:08x}")
+        self.tick = tick
+
+def state_checksum(sim):
+    # CRC32 of everything the inputs can influence: tick, player and enemy state
+    system = sim.enemy_system
+    n = len(system)
+    crc = zlib.crc32(np.array([sim.tick, sim.player.x, sim.player.y, n], dtype='<i8').tobytes())
+    for arr, dtype in ((system.xs, '<i4'), (system.ys, '<i4'), (system.types, 'u1')):
+        crc = zlib.crc32(arr[:n].astype(dtype).tobytes(), crc)
+    if hasattr(system, 'next_move'):
+        crc = zlib.crc32(system.next_move[:n].astype('<i8').tobytes(), crc)
+    return crc
+
+class Recorder:
+    # Attach to a freshly created Simulation (sim.recorder = Recorder(...)) before its first tick
+    def __init__(self, sim, map_size, world_mode, max_enemies, checksum_interval=CHECKSUM_INTERVAL):
+        self.settings = {
+            'seed': sim.seed,
+            'map_size': map_size,
+            'world_mode': world_mode,
+            'max_enemies': max_enemies,
+            'tick_rate': round(1.0 / sim.dt),
+        }
+        self.checksum_interval = checksum_interval
+        self.inputs = []       # moves (tick, dx, dy), edits (tick, x, y, value); issued before that tick
+        self.checkpoints = []  # (tick, checksum, wall seconds since recording started)
+        self.start = time.perf_counter()
+        self.ticks = sim.tick
+        self.checkpoint(sim)
+
+    def record_input(self, tick, dx, dy):
+        self.inputs.append((tick, dx, dy))
+
+    def record_edit(self, tick, x, y, value):
+        # Terrain edits share the input stream so their order relative to moves is kept
+        self.inputs.append((tick, x, y, value))
+
+    def on_tick(self, sim):
+        self.ticks = sim.tick
+        if sim.tick % self.checksum_interval == 0:
+            self.checkpoint(sim)
+
+    def checkpoint(self, sim):
+        self.checkpoints.append((sim.tick, state_checksum(sim), time.perf_counter() - self.start))
+
+    def to_dict(self):
+        return dict(self.settings, version=FORMAT_VERSION, ticks=self.ticks,
+                    checksum_interval=self.checksum_interval,
+                    inputs=self.inputs, checkpoints=self.checkpoints)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+def load_recording(path):
+    with open(path) as f:
+        recording = json.load(f)
+    if recording.get('version') != FORMAT_VERSION:
+        raise ValueError(f"unsupported recording version {recording.get('version')}")
+    return recording
+
+def replay(recording, verify=True):
+    # Re-run a recording headless; returns (sim, ticks, elapsed seconds). Raises ReplayMismatch.
+    sim = Simulation.create(recording['map_size'], seed=recording['seed'], world_mode=recording['world_mode'],
+                            max_enemies=recording['max_enemies'], tick_rate=recording['tick_rate'])
+    inputs = recording['inputs']
+    checkpoints = {tick: crc for tick, crc, _ in recording['checkpoints']} if verify else {}
+    next_input = 0
+    start = time.perf_counter()
+    for tick in range(sim.tick, recording['ticks'] + 1):
+        if tick in checkpoints:
+            actual = state_checksum(sim)
+            if actual != checkpoints[tick]:
+                raise ReplayMismatch(tick, checkpoints[tick], actual)
+        while next_input < len(inputs) and inputs[next_input][0] == tick:
+            if len(inputs[next_input]) == 4:
+                _, x, y, value = inputs[next_input]
+                sim.edit_terrain(x, y, value)
+            else:
+                _, dx, dy = inputs[next_input]
+                sim.move_player(dx, dy)
+            next_input += 1
+        if tick < recording['ticks']:
+            sim.step()
+    return sim, recording['ticks'], time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded session headless and verify it")
+    parser.add_argument("recording")
+    parser.add_argument("--no-verify", action="store_true", help="skip checksum verification")
+    args = parser.parse_args(argv)
+    recording = load_recording(args.recording)
+    try:
+        sim, ticks, elapsed = replay(recording, verify=not args.no_verify)
+    except ReplayMismatch as e:
+        print(f"FAILED: {e}", file=sys.stderr)
+        return 1
+    recorded = recording['checkpoints'][-1][2] if recording['checkpoints'] else 0.0
+    print(f"ok: {ticks} ticks, {len(recording['inputs'])} inputs, {len(recording['checkpoints'])} checksums; "
+          f"replayed in {elapsed:.3f}s ({ticks / max(elapsed, 1e-9):.0f} ticks/s, recorded {recorded:.1f}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# Savegame format: versioned little-endian binary with a 2-bit packed grid
+#
+# Layout:
+#   header   magic, version, flags, seed, tick, player x/y, enemy count, grid height/width
+#   grid     2 bits per cell (absent for the chunked world, which regenerates from the seed)
+#   enemies  xs int32[n], ys int32[n], seconds since last move float64[n], types uint8[n]
+#   crc32    of everything before it
+import os
+import struct
+import tempfile
+import zlib
+import numpy as np
+from procedural_map.grid import MapGrid, pack_cells, unpack_cells, packed_size
+from procedural_map.chunked_world import ChunkedWorld
+from simulation import Simulation
+
+MAGIC = b'PMSV'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHQIiiIII')
+CRC = struct.Struct('<I')
+FLAG_SEED = 1      # seed field is meaningful
+FLAG_CHUNKED = 2   # no grid stored: ChunkedWorld(seed)
+
+def encode(sim):
+    player = sim.player
+    system = sim.enemy_system
+    n = len(system)
+    chunked = isinstance(sim.map_grid, ChunkedWorld)
+    if chunked:
+        h = w = 0
+        grid = b''
+    else:
+        h, w = sim.map_grid.cells.shape
+        grid = pack_cells(sim.map_grid.cells).tobytes()
+    flags = (FLAG_SEED if sim.seed is not None else 0) | (FLAG_CHUNKED if chunked else 0)
+    parts = [
+        HEADER.pack(MAGIC, FORMAT_VERSION, flags, sim.seed or 0, sim.tick, player.x, player.y, n, h, w),
+        grid,
+        system.xs[:n].astype('<i4').tobytes(),
+        system.ys[:n].astype('<i4').tobytes(),
+        system.elapsed().astype('<f8').tobytes(),
+        system.types[:n].tobytes(),
+    ]
+    body = b''.join(parts)
+    return body + CRC.pack(zlib.crc32(body))
+
+def decode(data):
+    # data may be bytes, a memoryview or an mmap; arrays are read from it without per-cell objects
+    view = memoryview(data)
+    if len(view) < HEADER.size + CRC.size:
+        raise ValueError("savegame is truncated")
+    body = view[:-CRC.size]
+    if zlib.crc32(body) != CRC.unpack(view[-CRC.size:])[0]:
+        raise ValueError("savegame checksum mismatch")
+    magic, version, flags, seed, tick, px, py, n, h, w = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("not a savegame")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported savegame version {version}")
+    seed = seed if flags & FLAG_SEED else None
+    offset = HEADER.size
+    if flags & FLAG_CHUNKED:
+        map_grid = ChunkedWorld(seed)
+    else:
+        map_grid = MapGrid(unpack_cells(body, h, w, offset))
+        offset += packed_size(h, w)
+    xs = np.frombuffer(body, dtype='<i4', count=n, offset=offset)
+    ys = np.frombuffer(body, dtype='<i4', count=n, offset=offset + 4 * n)
+    elapsed = np.frombuffer(body, dtype='<f8', count=n, offset=offset + 8 * n)
+    types = np.frombuffer(body, dtype=np.uint8, count=n, offset=offset + 16 * n)
+    return Simulation.from_state(map_grid, seed, tick, (px, py), types, xs, ys, elapsed)
+
+def save_game(sim, path):
+    data = encode(sim)
+    directory = os.path.dirname(os.path.abspath(path))
+    # Same temp-file-and-rename as the map cache, so a crash never leaves half a save
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(data)
+
+def load_game(path):
+    with open(path, 'rb') as f:
+        return decode(f.read())
@@ -0,0 +1,58 @@
+# Timing wheel: events keyed by tick, popped in O(events due) instead of scanning everything
+import heapq
+
+WHEEL_SLOTS = 256
+
+class TimingWheel:
+    # One slot per tick for the next len(slots) ticks; anything later waits in a heap
+    # and moves into the wheel as its tick comes within range.
+    def __init__(self, slots=WHEEL_SLOTS, now=0):
+        self.slots = [[] for _ in range(slots)]
+        self.now = now  # tick whose events pop_due() returns next
+        self.overflow = []  # heap of (tick, seq, item)
+        self.seq = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, tick, item):
+        # Run item at tick; ticks already past run on the next pop
+        tick = max(tick, self.now)
+        if tick - self.now < len(self.slots):
+            self.slots[tick % len(self.slots)].append(item)
+        else:
+            heapq.heappush(self.overflow, (tick, self.seq, item))
+            self.seq += 1
+        self.count += 1
+
+    def schedule_in(self, delay, item):
+        self.schedule(self.now + delay, item)
+
+    def pop_due(self):
+        # Items due at the current tick, then advance one tick
+        slot = self.now % len(self.slots)
+        items, self.slots[slot] = self.slots[slot], []
+        self.count -= len(items)
+        self.now += 1
+        horizon = self.now + len(self.slots)
+        while self.overflow and self.overflow[0][0] < horizon:
+            tick, _, item = heapq.heappop(self.overflow)
+            self.slots[tick % len(self.slots)].append(item)
+        return items
+
+    def rewrite(self, fn):
+        # Replace every pending item with fn(item), dropping those that map to None
+        count = 0
+        for i, items in enumerate(self.slots):
+            if items:
+                self.slots[i] = [new for new in map(fn, items) if new is not None]
+                count += len(self.slots[i])
+        overflow = []
+        for tick, seq, item in self.overflow:
+            new = fn(item)
+            if new is not None:
+                overflow.append((tick, seq, new))
+        heapq.heapify(overflow)
+        self.overflow = overflow
+        self.count = count + len(overflow)
@@ -0,0 +1,83 @@
+# Background session loading: map generation and spawning run on a worker thread
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from simulation import Simulation
+
+class LoadCancelled(Exception):
+    pass
+
+class LoadJob:
+    # One session being built; progress is written by the worker and read by the UI
+    def __init__(self, key):
+        self.key = key
+        self.progress = 0.0
+        self.future = None
+        self.finished = None  # perf_counter time the session was ready
+        self.cancelled = False
+
+    def set_progress(self, fraction):
+        # Generation reports progress often, so this is where a running build notices cancel()
+        if self.cancelled:
+            raise LoadCancelled(self.key)
+        self.progress = fraction
+
+    def cancel(self):
+        # Drops a queued job outright; a running one stops at its next progress report
+        self.cancelled = True
+        self.future.cancel()
+
+    def _finish(self, future):
+        self.finished = time.perf_counter()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        # Re-raises anything the worker raised
+        return self.future.result()
+
+class SessionLoader:
+    def __init__(self, map_cache=None):
+        self.map_cache = map_cache
+        # One worker: a load and a prefetch never compete for the GIL at the same time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-loader")
+        self.prefetched = None  # Job speculatively started for the next session
+
+    def session_key(self, map_size, world_mode, map_seed):
+        # Settings that decide which session gets built; a prefetch is only reused if they match
+        return (map_size, world_mode, map_seed)
+
+    def _submit(self, key):
+        map_size, world_mode, map_seed = key
+        seed = map_seed if map_seed is not None else random.randrange(2**32)
+        # Fixed seeds are cached on disk; random ones would only fill the cache up
+        map_cache = self.map_cache if map_seed is not None else None
+        job = LoadJob(key)
+        job.future = self.executor.submit(
+            Simulation.create, map_size, seed=seed, world_mode=world_mode,
+            map_cache=map_cache, progress=job.set_progress)
+        job.future.add_done_callback(job._finish)
+        return job
+
+    def load(self, map_size, world_mode, map_seed):
+        # Job for the session to play now, taking over the prefetched one if it fits
+        key = self.session_key(map_size, world_mode, map_seed)
+        job, self.prefetched = self.prefetched, None
+        if job is None or job.key != key:
+            if job is not None:
+                # Settings changed since the prefetch; don't make this load queue behind it
+                job.cancel()
+            job = self._submit(key)
+        return job
+
+    def prefetch(self, map_size, world_mode, map_seed):
+        # Start building the next session while the current one is played
+        key = self.session_key(map_size, world_mode, map_seed)
+        if self.prefetched is None or self.prefetched.key != key:
+            if self.prefetched is not None:
+                self.prefetched.cancel()
+            self.prefetched = self._submit(key)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
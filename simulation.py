@@ -0,0 +1,268 @@
+# Headless simulation core: map, player and enemies stepped at a fixed timestep (no pygame)
+import argparse
+import math
+import random
+import time
+import numpy as np
+from procedural_map.map_generator import generate_map, ROAD, FOREST
+from procedural_map.chunked_world import ChunkedWorld
+from procedural_map.grid import MapGrid
+from procedural_map.road_graph import get_road_graph
+from procedural_map.terrain_editor import TerrainEditor
+from player import Player
+from enemies.flow_field import FlowField
+from enemies.enemy_system import EnemySystem, TYPE_IDS
+from enemies.sharded import ShardedEnemySystem
+from spatial_hash import SpatialHash
+from scheduler import TimingWheel
+from spawning import SpawnSampler
+from visibility import Visibility
+
+TICK_RATE = 60
+MAX_ENEMIES = 10
+# Longest wall-clock gap advance() will catch up on, so a stall doesn't trigger a burst of ticks
+MAX_FRAME_TIME = 0.25
+# Spawn constraints: path distance from the player and Manhattan gap between enemies. Off by
+# default, so sessions get min(max_enemies, free road cells) enemies; callers opt in.
+SPAWN_MIN_DISTANCE = 0
+SPAWN_MIN_SEPARATION = 0
+# Seeds feed numpy generators and the savegame header, both of which need unsigned 64-bit values
+MAX_SEED = 2**64 - 1
+
+def seed_arg(text):
+    # argparse type for --seed options
+    seed = int(text)
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and {MAX_SEED}")
+    return seed
+
+class Simulation:
+    def __init__(self, map_grid, seed=None, max_enemies=MAX_ENEMIES, tick_rate=TICK_RATE, shards=0):
+        self.map_grid = map_grid
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.dt = 1.0 / tick_rate
+        self.tick = 0
+        self.accumulator = 0.0
+        self.recorder = None  # Optional replay.Recorder capturing inputs and checksums
+        self.scheduler = TimingWheel()  # Future actions (spawns, effects) by tick; see schedule()
+        self.spatial_index = SpatialHash()
+        self.player = Player(map_grid)
+        self.player.spatial_index = self.spatial_index
+        self.spatial_index.insert(self.player)
+        # One distance field toward the player shared by every chasing enemy
+        self.flow_field = FlowField(map_grid) if isinstance(map_grid, MapGrid) else None
+        if self.flow_field:
+            self.flow_field.update(self.player.x, self.player.y)
+        # Player field of view: fog of war and hunter line of sight (finite maps only)
+        self.visibility = Visibility(map_grid) if isinstance(map_grid, MapGrid) else None
+        if self.visibility:
+            self.visibility.update(self.player.x, self.player.y)
+        # Enemy state lives in the batched system; self.enemies holds class views onto it.
+        # With shards > 1 (finite maps) enemies tick in worker processes and get no views.
+        self.sharded = shards > 1 and isinstance(map_grid, MapGrid)
+        if self.sharded:
+            self.enemy_system = ShardedEnemySystem(map_grid, shards, seed=seed, flow_field=self.flow_field,
+                                                   visibility=self.visibility, dt=self.dt)
+        else:
+            self.enemy_system = EnemySystem(map_grid, seed=seed, dt=self.dt)
+            self.enemy_system.flow_field = self.flow_field
+            self.enemy_system.spatial_index = self.spatial_index
+            self.enemy_system.visibility = self.visibility
+        # Runtime dig/block edits (finite maps only); caches patch themselves per edited cell
+        self.terrain = TerrainEditor(map_grid) if isinstance(map_grid, MapGrid) else None
+        if self.terrain:
+            if self.flow_field:
+                self.terrain.subscribe(self.flow_field.on_terrain_change)
+            if self.visibility:
+                self.terrain.subscribe(self.visibility.on_terrain_change)
+            if self.sharded:
+                self.terrain.subscribe(self.enemy_system.on_terrain_change)
+        self.enemies = []
+        self.spawn_enemies(max_enemies)
+
+    @classmethod
+    def create(cls, map_size=128, seed=None, world_mode="finite", map_cache=None, progress=None, **kwargs):
+        # Build the map for a new session; map_cache (a MapCache) is used for finite maps if given.
+        # progress is called with the completed fraction of map generation.
+        if seed is None:
+            seed = random.randrange(2**32)
+        if world_mode == "chunked":
+            map_grid = ChunkedWorld(seed)
+        elif map_cache is not None:
+            map_grid = map_cache.get_or_generate(map_size, seed, progress=progress)
+        else:
+            map_grid = generate_map(map_size, seed=seed, progress=progress)
+        return cls(map_grid, seed=seed, **kwargs)
+
+    @classmethod
+    def from_state(cls, map_grid, seed, tick, player_pos, types, xs, ys, elapsed, **kwargs):
+        # Rebuild a saved session (see savegame.py) instead of spawning a fresh one
+        sim = cls(map_grid, seed=seed, max_enemies=0, **kwargs)
+        sim.tick = tick
+        sim.place_player(*player_pos)
+        system = sim.enemy_system
+        indices = system.add_many(types, xs, ys)
+        system.set_elapsed(indices, elapsed)
+        for i in indices.tolist():
+            enemy = system.view(i)
+            sim.spatial_index.insert(enemy)
+            sim.enemies.append(enemy)
+        return sim
+
+    @property
+    def time(self):
+        return self.tick * self.dt
+
+    def spawn_enemies(self, max_enemies, zones=None, min_distance=SPAWN_MIN_DISTANCE,
+                      min_separation=SPAWN_MIN_SEPARATION):
+        # zones maps an enemy type to a world rect (x0, y0, x1, y1) its spawns must lie in.
+        # Returns how many were placed; constraints the map can't meet make that fewer than asked.
+        player = self.player
+        if isinstance(self.map_grid, ChunkedWorld):
+            # Only the chunks around the player are candidates in an unbounded world
+            span = 3 * self.map_grid.chunk_size
+            x0, y0 = player.x - span // 2, player.y - span // 2
+            self.map_grid.ensure_around(player.x, player.y)
+            road_index = np.flatnonzero(self.map_grid.window(x0, y0, span, span) == ROAD)
+        else:
+            span = len(self.map_grid)
+            x0 = y0 = 0
+            road_index = self.map_grid.get_road_index()
+        if self.flow_field:
+            distance = self.flow_field.distance
+        else:
+            # No flow field in the chunked world: straight-line (Manhattan) distance instead
+            def distance(x, y):
+                return abs(x - player.x) + abs(y - player.y)
+        sampler = SpawnSampler(road_index, span, self.rng, origin=(x0, y0), distance=distance)
+        sampler.exclude(player.x, player.y)
+        # Split what fits, as before, so a small map still gets every type
+        max_enemies = min(max_enemies, len(road_index) - len(sampler.taken))
+        # Percentages: 40% wanderer, 30% follower, 30% hunter
+        num_wanderer = int(max_enemies * 0.4)
+        num_follower = int(max_enemies * 0.3)
+        num_hunter = max_enemies - num_wanderer - num_follower
+        zones = zones or {}
+        spawns = []
+        for etype, count in (('wanderer', num_wanderer), ('follower', num_follower), ('hunter', num_hunter)):
+            cells = sampler.sample(count, zone=zones.get(etype), min_distance=min_distance,
+                                   min_separation=min_separation)
+            spawns.extend((etype, x, y) for x, y in cells)
+        # Mixed spawn order, as before
+        self.rng.shuffle(spawns)
+        if self.sharded:
+            if spawns:
+                etypes, xs, ys = zip(*spawns)
+                self.enemy_system.add_many([TYPE_IDS[t] for t in etypes], xs, ys)
+            return len(spawns)
+        for etype, x, y in spawns:
+            enemy = self.enemy_system.add(etype, x, y)
+            self.spatial_index.insert(enemy)
+            self.enemies.append(enemy)
+        return len(spawns)
+
+    def place_player(self, x, y):
+        # Put the player on (x, y) directly, e.g. when restoring a save
+        player = self.player
+        player.x, player.y = x, y
+        self.spatial_index.update(player)
+        if isinstance(self.map_grid, ChunkedWorld):
+            self.map_grid.ensure_around(x, y)
+        if self.flow_field:
+            self.flow_field.update(x, y)
+        if self.visibility:
+            self.visibility.update(x, y)
+
+    def move_player(self, dx, dy):
+        # Returns True if the player moved
+        if self.recorder is not None:
+            self.recorder.record_input(self.tick, dx, dy)
+        old = (self.player.x, self.player.y)
+        self.player.move(dx, dy)
+        if (self.player.x, self.player.y) == old:
+            return False
+        if self.flow_field:
+            self.flow_field.update(self.player.x, self.player.y)
+        if self.visibility:
+            self.visibility.update(self.player.x, self.player.y)
+        return True
+
+    def dig(self, x, y):
+        # Turn (x, y) into road; returns the TerrainChange or None
+        return self.edit_terrain(x, y, ROAD)
+
+    def block(self, x, y):
+        # Turn (x, y) into forest; the player's own cell can't be blocked
+        if (x, y) == (self.player.x, self.player.y):
+            return None
+        return self.edit_terrain(x, y, FOREST)
+
+    def edit_terrain(self, x, y, value):
+        if self.recorder is not None:
+            self.recorder.record_edit(self.tick, x, y, value)
+        if self.terrain is None:
+            return None
+        return self.terrain.set_cell(x, y, value)
+
+    def find_path(self, start, goal):
+        # Hierarchical path query over the road graph; None in the chunked world
+        graph = get_road_graph(self.map_grid)
+        return graph.find_path(start, goal) if graph else None
+
+    def schedule(self, delay, action, *args):
+        # Run action(*args) at the start of the first tick at least delay seconds from now
+        self.scheduler.schedule_in(math.ceil(delay / self.dt - 1e-9), (action, args))
+
+    def step(self):
+        # One fixed timestep; returns the indices of enemies that moved
+        for action, args in self.scheduler.pop_due():
+            action(*args)
+        moved = self.enemy_system.update(self.dt, self.player)
+        self.tick += 1
+        if self.recorder is not None:
+            self.recorder.on_tick(self)
+        return moved
+
+    def advance(self, elapsed):
+        # Feed wall-clock time from a render loop; runs as many fixed steps as are due
+        self.accumulator += min(elapsed, MAX_FRAME_TIME)
+        steps = 0
+        while self.accumulator >= self.dt:
+            self.accumulator -= self.dt
+            self.step()
+            steps += 1
+        return steps
+
+    def run(self, ticks):
+        # Headless: step as fast as possible
+        for _ in range(ticks):
+            self.step()
+
+    def close(self):
+        # Stops shard workers; a no-op for the in-process enemy system
+        if self.sharded:
+            self.enemy_system.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simulation headless as fast as possible")
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=128)
+    parser.add_argument("--seed", type=seed_arg, default=None)
+    parser.add_argument("--enemies", type=int, default=MAX_ENEMIES)
+    parser.add_argument("--world", choices=["finite", "chunked"], default="finite")
+    parser.add_argument("--shards", type=int, default=0, help="tick enemies in this many worker processes")
+    args = parser.parse_args(argv)
+    sim = Simulation.create(args.size, seed=args.seed, world_mode=args.world, max_enemies=args.enemies,
+                            shards=args.shards)
+    start = time.perf_counter()
+    try:
+        sim.run(args.ticks)
+    finally:
+        sim.close()
+    elapsed = time.perf_counter() - start
+    print(f"seed={sim.seed} enemies={len(sim.enemy_system)} ticks={args.ticks} "
+          f"elapsed={elapsed:.3f}s ticks/s={args.ticks / elapsed:.0f}")
+
+if __name__ == "__main__":
+    main()
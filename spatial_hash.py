@@ -0,0 +1,62 @@
+# Spatial hash: uniform grid of buckets over entity positions
+class SpatialHash:
+    def __init__(self, bucket_size=8):
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        self.entity_keys = {}
+
+    def _key(self, x, y):
+        return (x // self.bucket_size, y // self.bucket_size)
+
+    def __len__(self):
+        return len(self.entity_keys)
+
+    def insert(self, entity):
+        key = self._key(entity.x, entity.y)
+        self.buckets.setdefault(key, set()).add(entity)
+        self.entity_keys[entity] = key
+
+    def remove(self, entity):
+        key = self.entity_keys.pop(entity, None)
+        if key is None:
+            return
+        bucket = self.buckets[key]
+        bucket.discard(entity)
+        if not bucket:
+            del self.buckets[key]
+
+    def update(self, entity):
+        # Call after an entity moved; only touches buckets when it changed bucket
+        key = self._key(entity.x, entity.y)
+        old = self.entity_keys.get(entity)
+        if old == key:
+            return
+        if old is not None:
+            bucket = self.buckets[old]
+            bucket.discard(entity)
+            if not bucket:
+                del self.buckets[old]
+        self.buckets.setdefault(key, set()).add(entity)
+        self.entity_keys[entity] = key
+
+    def clear(self):
+        self.buckets.clear()
+        self.entity_keys.clear()
+
+    def query_rect(self, x0, y0, x1, y1):
+        # Entities with x0 <= x < x1 and y0 <= y < y1
+        bx0, by0 = self._key(x0, y0)
+        bx1, by1 = self._key(x1 - 1, y1 - 1)
+        found = []
+        buckets = self.buckets
+        for by in range(by0, by1 + 1):
+            for bx in range(bx0, bx1 + 1):
+                bucket = buckets.get((bx, by))
+                if bucket:
+                    found.extend(e for e in bucket if x0 <= e.x < x1 and y0 <= e.y < y1)
+        return found
+
+    def query_radius(self, x, y, radius):
+        # Entities within Manhattan distance radius of (x, y), matching grid movement
+        candidates = self.query_rect(x - radius, y - radius, x + radius + 1, y + radius + 1)
+        return [e for e in candidates if abs(e.x - x) + abs(e.y - y) <= radius]
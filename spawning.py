@@ -0,0 +1,88 @@
+# Spawn placement: rejection sampling straight from a sorted road-cell index
+import numpy as np
+
+# Give up after this many draws per requested spawn when constraints reject most cells
+ATTEMPTS_PER_SPAWN = 50
+
+class SpawnSampler:
+    def __init__(self, road_index, width, rng, origin=(0, 0), distance=None):
+        # road_index: sorted linear indices (row-major, rows of `width`) of road cells in a
+        # region whose top-left world cell is origin. distance(x, y) gives the path distance
+        # to the player (negative if unreachable) for min_distance checks.
+        self.road_index = road_index
+        self.width = width
+        self.rng = rng
+        self.ox, self.oy = origin
+        self.distance = distance
+        self.taken = set()
+        # Placed spawns bucketed by separation-sized cells, so each check looks at 9 buckets
+        self.buckets = {}
+        self.bucket_size = 1
+
+    def _slice(self, zone):
+        # Index range holding the zone's rows: the index is sorted, so rows are contiguous
+        if zone is None:
+            return 0, len(self.road_index)
+        x0, y0, x1, y1 = zone
+        lo = (max(y0 - self.oy, 0)) * self.width
+        hi = (max(y1 - self.oy, 0)) * self.width
+        return (int(np.searchsorted(self.road_index, lo)),
+                int(np.searchsorted(self.road_index, hi)))
+
+    def _too_close(self, x, y, min_separation):
+        if min_separation <= 0:
+            return False
+        b = self.bucket_size
+        bx, by = x // b, y // b
+        for cy in range(by - 1, by + 2):
+            for cx in range(bx - 1, bx + 2):
+                for px, py in self.buckets.get((cx, cy), ()):
+                    if abs(px - x) + abs(py - y) < min_separation:
+                        return True
+        return False
+
+    def _place(self, x, y, linear):
+        self.taken.add(linear)
+        self.buckets.setdefault((x // self.bucket_size, y // self.bucket_size), []).append((x, y))
+
+    def exclude(self, x, y):
+        # Keep a cell (e.g. the player's) free without counting it as a spawn
+        self.taken.add((y - self.oy) * self.width + (x - self.ox))
+
+    def sample(self, k, zone=None, min_distance=0, min_separation=0):
+        # Up to k distinct road cells as (x, y); fewer if the constraints can't be met in time.
+        # zone is a world rect (x0, y0, x1, y1), end-exclusive. min_separation (Manhattan)
+        # also applies against spawns from earlier calls on this sampler.
+        if min_separation > self.bucket_size:
+            self._rebucket(min_separation)
+        lo, hi = self._slice(zone)
+        if hi <= lo:
+            return []
+        road_index, width, randrange = self.road_index, self.width, self.rng.randrange
+        picked = []
+        attempts = ATTEMPTS_PER_SPAWN * k
+        while len(picked) < k and attempts > 0:
+            attempts -= 1
+            linear = int(road_index[randrange(lo, hi)])
+            if linear in self.taken:
+                continue
+            x = self.ox + linear % width
+            y = self.oy + linear // width
+            if zone is not None and not (zone[0] <= x < zone[2]):
+                continue
+            if min_distance > 0 and self.distance is not None:
+                d = self.distance(x, y)
+                if d < min_distance:
+                    continue
+            if self._too_close(x, y, min_separation):
+                continue
+            self._place(x, y, linear)
+            picked.append((x, y))
+        return picked
+
+    def _rebucket(self, bucket_size):
+        points = [p for bucket in self.buckets.values() for p in bucket]
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        for x, y in points:
+            self.buckets.setdefault((x // bucket_size, y // bucket_size), []).append((x, y))
@@ -0,0 +1,56 @@
+# Session server against raw client frames
+import asyncio
+from simulation import Simulation
+from net.server import SessionServer
+from net import protocol
+
+async def _connect(server_port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", server_port)
+    writer.write(protocol.frame(protocol.HELLO))
+    msg_type, _ = await protocol.read_frame(reader)
+    assert msg_type == protocol.WELCOME
+    return reader, writer
+
+async def _closed(reader):
+    # Drain frames until the server hangs up
+    try:
+        while True:
+            await asyncio.wait_for(protocol.read_frame(reader), 2)
+    except asyncio.IncompleteReadError:
+        return True
+
+def _serve(check):
+    async def run():
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        sim = Simulation.create(64, seed=1, max_enemies=5, tick_rate=30)
+        server = SessionServer(sim, tick_rate=30)
+        ready = loop.create_future()
+        task = asyncio.ensure_future(server.serve("127.0.0.1", 0, ready))
+        try:
+            await check(server, await ready)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        assert errors == []
+    asyncio.run(run())
+
+def test_malformed_move_disconnects_client():
+    async def check(server, port):
+        reader, writer = await _connect(port)
+        writer.write(protocol.frame(protocol.MOVE, b'\x01'))
+        assert await _closed(reader)
+        assert server.clients == {}
+        writer.close()
+    _serve(check)
+
+def test_move_longer_than_one_step_disconnects_client():
+    async def check(server, port):
+        reader, writer = await _connect(port)
+        start = (server.sim.player.x, server.sim.player.y)
+        writer.write(protocol.encode_move(-10, 0))
+        assert await _closed(reader)
+        assert (server.sim.player.x, server.sim.player.y) == start
+        writer.close()
+    _serve(check)
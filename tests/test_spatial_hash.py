@@ -0,0 +1,19 @@
+# SpatialHash queries against a brute-force scan
+import random
+from spatial_hash import SpatialHash
+
+class Entity:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+def test_query_radius_matches_scan():
+    rng = random.Random(1)
+    index = SpatialHash(bucket_size=8)
+    entities = [Entity(rng.randrange(100), rng.randrange(100)) for _ in range(500)]
+    for e in entities:
+        index.insert(e)
+    for _ in range(50):
+        x, y, radius = rng.randrange(100), rng.randrange(100), rng.randrange(20)
+        expected = {e for e in entities if abs(e.x - x) + abs(e.y - y) <= radius}
+        assert set(index.query_radius(x, y, radius)) == expected
@@ -0,0 +1,85 @@
+# Random dig/block sequences through TerrainEditor, checked against full recomputation
+import random
+import numpy as np
+import pytest
+from procedural_map.grid import ROAD
+from procedural_map.map_generator import generate_map, flood
+from procedural_map.terrain_editor import TerrainEditor
+from enemies.flow_field import FlowField
+
+SIZE = 40
+EDITS = 400
+
+def random_edit(rng, cells):
+    # Mostly cells on or next to a road, where edits join and split components
+    size = cells.shape[0]
+    if rng.random() < 0.1:
+        return rng.randrange(1, size - 1), rng.randrange(1, size - 1)
+    ys, xs = np.nonzero(cells == ROAD)
+    k = rng.randrange(len(xs))
+    dx, dy = rng.choice([(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)])
+    return int(xs[k]) + dx, int(ys[k]) + dy
+
+def root_mask(cells):
+    c = cells.shape[0] // 2
+    if cells[c, c] != ROAD:
+        return np.zeros(cells.shape, dtype=bool)
+    return flood(cells, c, c)
+
+def edits(seed):
+    # (editor, change) after every edit that changed a cell, starting from a fresh map
+    rng = random.Random(seed)
+    grid = generate_map(SIZE, seed=seed)
+    editor = TerrainEditor(grid)
+    editor.get_connectivity()
+    for _ in range(EDITS):
+        x, y = random_edit(rng, grid.cells)
+        change = editor.dig(x, y) if grid.cells[y, x] != ROAD else editor.block(x, y)
+        if change is not None:
+            yield editor, change
+
+@pytest.mark.parametrize("seed", range(5))
+def test_components_match_flood(seed):
+    before = None
+    for editor, change in edits(seed):
+        cells = change.map_grid.cells
+        connectivity = editor.connectivity
+        # Every component is exactly what a flood from one of its cells reaches
+        assert sorted(connectivity.label) == np.flatnonzero(cells == ROAD).tolist()
+        for members in connectivity.members.values():
+            i = next(iter(members))
+            reached = np.flatnonzero(flood(cells, i % SIZE, i // SIZE))
+            assert sorted(members) == reached.tolist()
+        # The change reports what gained and lost the path to the center
+        after = root_mask(cells).reshape(-1)
+        if before is not None:
+            assert sorted(change.connected) == np.flatnonzero(after & ~before).tolist()
+            assert sorted(change.disconnected) == np.flatnonzero(before & ~after).tolist()
+        before = after
+
+@pytest.mark.parametrize("seed", range(5))
+def test_flow_field_matches_rebuild(seed):
+    rng = random.Random(seed)
+    grid = generate_map(SIZE, seed=seed)
+    editor = TerrainEditor(grid)
+    field = FlowField(grid)
+    ys, xs = np.nonzero(grid.cells == ROAD)
+    k = rng.randrange(len(xs))
+    field.update(int(xs[k]), int(ys[k]))
+    editor.subscribe(field.on_terrain_change)
+    for _ in range(EDITS):
+        x, y = random_edit(rng, grid.cells)
+        if grid.cells[y, x] != ROAD:
+            editor.dig(x, y)
+        else:
+            editor.block(x, y)
+        fresh = FlowField(grid)
+        fresh.rebuild(*field.root)
+        assert np.array_equal(field.dist_grid, fresh.dist_grid)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_road_index_tracks_edits(seed):
+    for editor, change in edits(seed):
+        grid = change.map_grid
+        assert grid.road_index is not None
+        assert np.array_equal(grid.get_road_index(), np.flatnonzero(grid.cells == ROAD))
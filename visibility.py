@@ -0,0 +1,93 @@
+# Field of view: symmetric shadowcasting from the player, plus an explored mask for fog of war
+import numpy as np
+from procedural_map.grid import ROAD
+
+FOV_RADIUS = 12
+# (depth, col) -> (dx, dy) for the four quadrants: north, east, south, west
+QUADRANTS = [
+    lambda depth, col: (col, -depth),
+    lambda depth, col: (depth, col),
+    lambda depth, col: (col, depth),
+    lambda depth, col: (-depth, col),
+]
+
+class Visibility:
+    # Only cells within radius of the player are touched per move, so cost does not grow with the map
+    def __init__(self, map_grid, radius=FOV_RADIUS):
+        self.map_grid = map_grid
+        self.size = len(map_grid)
+        self.radius = radius
+        self.visible = np.zeros((self.size, self.size), dtype=bool)
+        self.explored = np.zeros((self.size, self.size), dtype=bool)
+        self.visible_cells = np.zeros(0, dtype=np.intp)  # flat indices currently lit
+        self.origin = None
+        self.opaque = bytearray()
+        self.grid_version = None
+        # Bumped whenever visible/explored change, for render caches
+        self.version = 0
+
+    def update(self, x, y):
+        # Recompute the field of view around (x, y); nothing to do if the player didn't move
+        grid_version = getattr(self.map_grid, 'version', 0)
+        if self.origin == (x, y) and self.grid_version == grid_version:
+            return
+        if self.grid_version != grid_version:
+            self.opaque = bytearray((self.map_grid.cells != ROAD).tobytes())
+            self.grid_version = grid_version
+        self.visible.flat[self.visible_cells] = False
+        self.visible_cells = np.fromiter(self._cast(x, y), dtype=np.intp)
+        self.visible.flat[self.visible_cells] = True
+        self.explored.flat[self.visible_cells] = True
+        self.origin = (x, y)
+        self.version += 1
+
+    def on_terrain_change(self, change):
+        # Patch the opacity cache for one edited cell; recast only if it is within view range
+        if self.grid_version != change.version - 1:
+            return  # Already stale; the next update() rebuilds it anyway
+        self.opaque[change.index] = change.new != ROAD
+        self.grid_version = change.version
+        if self.origin is not None:
+            ox, oy = self.origin
+            if max(abs(change.x - ox), abs(change.y - oy)) <= self.radius:
+                self.origin = None
+                self.update(ox, oy)
+
+    def can_see(self, x, y):
+        # Line of sight between the player and (x, y). Shadowcasting here is symmetric,
+        # so this also answers whether (x, y) can see the player.
+        return 0 <= x < self.size and 0 <= y < self.size and bool(self.visible[y, x])
+
+    def _cast(self, ox, oy):
+        # Symmetric shadowcasting (Albert Ford's variant) with slopes kept as integer fractions
+        size, radius, opaque = self.size, self.radius, self.opaque
+        r2 = radius * radius
+        yield oy * size + ox
+        for transform in QUADRANTS:
+            # Rows to scan: (depth, start slope num/den, end slope num/den)
+            rows = [(1, -1, 1, 1, 1)]
+            while rows:
+                depth, sn, sd, en, ed = rows.pop()
+                if depth > radius:
+                    continue
+                min_col = (2 * depth * sn + sd) // (2 * sd)
+                max_col = -((ed - 2 * depth * en) // (2 * ed))
+                prev_wall = None
+                for col in range(min_col, max_col + 1):
+                    dx, dy = transform(depth, col)
+                    x, y = ox + dx, oy + dy
+                    inside = 0 <= x < size and 0 <= y < size
+                    i = y * size + x
+                    wall = not inside or opaque[i] == 1
+                    if inside and col * col + depth * depth <= r2:
+                        # Walls are always shown; floors only if the origin sees their center
+                        if wall or (col * sd >= depth * sn and col * ed <= depth * en):
+                            yield i
+                    if prev_wall and not wall:
+                        # Slope of this tile's near edge starts the lit span
+                        sn, sd = 2 * col - 1, 2 * depth
+                    if prev_wall is False and wall:
+                        rows.append((depth + 1, sn, sd, 2 * col - 1, 2 * depth))
+                    prev_wall = wall
+                if prev_wall is False:
+                    rows.append((depth + 1, sn, sd, en, ed))